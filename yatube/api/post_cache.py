@@ -0,0 +1,60 @@
+"""Кеш сериализованных постов для пакетной выдачи по id.
+
+Имя автора и slug группы в кешированное значение не входят: они
+подставляются при чтении из кеша объектов, который сбрасывается при
+сохранении пользователя или группы. Иначе после переименования пакетная
+выдача отдавала бы старые значения до истечения кеша.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from core.object_cache import object_cache
+from posts.models import Group, Post
+
+from .serializers import serialize_post
+
+User = get_user_model()
+POST_CACHE_TIMEOUT = 60 * 60
+
+
+def post_cache_key(post_id):
+    return f'api_post:{post_id}'
+
+
+def _cached_value(post):
+    data = dict(serialize_post(post), author=None, group=None)
+    return data, post.author_id, post.group_id
+
+
+def get_serialized_posts(post_ids):
+    """Словарь {id: пост в JSON}; промахи кеша — одним запросом in_bulk."""
+    keys = {post_cache_key(post_id): post_id for post_id in post_ids}
+    found = {keys[key]: value
+             for key, value in cache.get_many(list(keys)).items()}
+    missing = [post_id for post_id in post_ids if post_id not in found]
+    if missing:
+        posts = Post.objects.select_related('author', 'group').in_bulk(missing)
+        # Авторы и группы уже загружены — кладём их в кеш объектов,
+        # чтобы не читать их ниже отдельными запросами.
+        object_cache.prime(post.author for post in posts.values())
+        object_cache.prime(
+            post.group for post in posts.values() if post.group_id)
+        fresh = {pk: _cached_value(post) for pk, post in posts.items()}
+        cache.set_many(
+            {post_cache_key(pk): value for pk, value in fresh.items()},
+            POST_CACHE_TIMEOUT)
+        found.update(fresh)
+    authors = object_cache.get_many(
+        User, {author_id for _, author_id, _ in found.values()})
+    groups = object_cache.get_many(
+        Group, {group_id for _, _, group_id in found.values()} - {None})
+    result = {}
+    for pk, (data, author_id, group_id) in found.items():
+        group = groups.get(group_id)
+        result[pk] = dict(data, author=authors[author_id].username,
+                          group=group.slug if group else None)
+    return result
+
+
+def forget_post(post_id):
+    cache.delete(post_cache_key(post_id))
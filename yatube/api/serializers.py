@@ -0,0 +1,30 @@
+"""Преобразование моделей в словари для JSON.
+
+Функции читают только уже загруженные поля и связанные объекты,
+поэтому вызывающий код должен выбрать авторов и группы через
+select_related — иначе на каждый объект уйдёт отдельный запрос.
+"""
+from django.urls import reverse
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'url': reverse('posts:post_detail', args=[post.pk]),
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+        'parent': comment.parent_id,
+        'depth': comment.depth,
+    }
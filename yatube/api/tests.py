@@ -0,0 +1,124 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='api_author')
+        cls.reader = User.objects.create_user(username='api_reader')
+        cls.group = Group.objects.create(
+            title='API', slug='api', description='Группа для API')
+        cls.posts = [
+            Post.objects.create(author=cls.user, group=cls.group,
+                                text=f'Пост {i}')
+            for i in range(25)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_are_serialized_without_extra_queries(self):
+        """Страница ленты собирается одним запросом к постам."""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api:index'))
+        data = response.json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(data['results'][0]['text'], 'Пост 24')
+        self.assertEqual(data['results'][0]['group'], 'api')
+        response = self.client.get(data['next'])
+        self.assertEqual(len(response.json()['results']), 5)
+        self.assertIsNone(response.json()['next'])
+
+    def test_unchanged_feed_returns_not_modified(self):
+        """С тем же ETag ответ 304 и без запросов к постам."""
+        url = reverse('api:group_posts', kwargs={'slug': 'api'})
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.user, group=self.group, text='Новый')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_detail_etag_follows_comments(self):
+        """Новый комментарий меняет ETag поста."""
+        post = self.posts[0]
+        url = reverse('api:post_detail', kwargs={'post_id': post.pk})
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(response.json()['post']['id'], post.pk)
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['comments'][0]['text'], 'Ок')
+
+    def test_renames_change_etag(self):
+        """Переименование автора или группы меняет ETag ленты."""
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        # Вход сохраняет только last_login и ETag не сбрасывает.
+        self.client.force_login(self.reader)
+        self.client.logout()
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        author = User.objects.get(pk=self.user.pk)
+        author.username = 'renamed_author'
+        author.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['author'],
+                         'renamed_author')
+        etag = response['ETag']
+        Group.objects.filter(pk=self.group.pk).first().save()
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_follow_feed_requires_login(self):
+        """Лента подписок доступна только авторизованным."""
+        url = reverse('api:follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.client.force_login(self.reader)
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_batch_lookup_uses_post_cache(self):
+        """Пакетная выдача сохраняет порядок и берёт посты из кеша."""
+        ids = [self.posts[3].pk, self.posts[1].pk, 999999]
+        url = reverse('api:post_batch')
+        query = {'ids': ','.join(map(str, ids))}
+        with self.assertNumQueries(1):
+            data = self.client.get(url, query).json()
+        self.assertEqual([post['id'] for post in data['results']], ids[:2])
+        self.assertEqual(data['missing'], [999999])
+        with self.assertNumQueries(1):
+            # Остался только запрос по отсутствующему id.
+            self.client.get(url, query)
+        self.posts[3].text = 'Исправленный'
+        self.posts[3].save()
+        data = self.client.get(url, query).json()
+        self.assertEqual(data['results'][0]['text'], 'Исправленный')
+        author = User.objects.get(pk=self.user.pk)
+        author.username = 'renamed'
+        author.save()
+        data = self.client.get(url, query).json()
+        self.assertEqual(data['results'][1]['author'], 'renamed')
+
+    def test_batch_lookup_validates_ids(self):
+        """Неверный или слишком длинный список id отклоняется."""
+        url = reverse('api:post_batch')
+        self.assertEqual(
+            self.client.get(url, {'ids': '1,x'}).status_code, 400)
+        for ids in ('0', '-1', str(2 ** 64)):
+            with self.subTest(ids=ids):
+                self.assertEqual(
+                    self.client.get(url, {'ids': ids}).status_code, 400)
+        too_many = ','.join(str(i) for i in range(1, 300))
+        self.assertEqual(
+            self.client.get(url, {'ids': too_many}).status_code, 400)
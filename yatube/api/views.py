@@ -0,0 +1,164 @@
+"""Версия 1 API только для чтения: ленты и посты в JSON.
+
+У каждого ответа есть сильный ETag, собранный из счётчиков поколений
+лент (posts.feeds). Счётчики читаются из кеша до выполнения запросов
+к постам, поэтому при неизменной ленте клиент с If-None-Match получает
+304 Not Modified, а сама выборка не выполняется.
+"""
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_GET
+
+from posts.feeds import (INDEX_FEED, NAMES_FEED, author_feed,
+                         combined_generation, get_generation, group_feed,
+                         post_feed)
+from posts.follows import follow_feeds
+from posts.models import Group, Post
+from posts.utils import keyset_page
+
+from .post_cache import get_serialized_posts
+from .serializers import serialize_comment, serialize_post
+
+User = get_user_model()
+API_PAGE_SIZE = 20
+MAX_BATCH_IDS = 200
+# Больше не помещается в первичный ключ, и база отвечает ошибкой.
+MAX_POST_ID = 2 ** 63 - 1
+
+
+def make_etag(request, *parts):
+    """ETag зависит от поколений лент, курсора и пользователя.
+
+    В ответ входят имена авторов и slug групп, поэтому к частям всегда
+    добавляется поколение NAMES_FEED.
+    """
+    raw = '|'.join(str(part) for part in (
+        *parts, get_generation(NAMES_FEED),
+        request.GET.get('cursor', ''), request.user.pk))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def feed_etag(feed):
+    return lambda request, **kwargs: make_etag(
+        request, feed, get_generation(feed))
+
+
+def lookup_etag(model, field, feed_for_pk):
+    """ETag ленты, которую находят по slug или имени пользователя."""
+    def etag(request, **kwargs):
+        pk = (model.objects.filter(**{field: kwargs[field]})
+              .values_list('pk', flat=True).first())
+        if pk is None:
+            return None
+        feed = feed_for_pk(pk)
+        return make_etag(request, feed, get_generation(feed))
+    return etag
+
+
+def follow_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    feeds = follow_feeds(request.user)
+    return make_etag(request, feeds[0], combined_generation(feeds))
+
+
+def post_etag(request, post_id):
+    feed = post_feed(post_id)
+    return make_etag(request, feed, get_generation(feed))
+
+
+def feed_response(request, posts):
+    page = keyset_page(
+        posts.select_related('author', 'group'),
+        request.GET.get('cursor'),
+        per_page=API_PAGE_SIZE,
+    )
+    next_url = None
+    if page.next_cursor:
+        next_url = request.build_absolute_uri(
+            f'{request.path}?cursor={page.next_cursor}')
+    return JsonResponse({
+        'results': [serialize_post(post) for post in page],
+        'next': next_url,
+    })
+
+
+@require_GET
+@condition(etag_func=feed_etag(INDEX_FEED))
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@require_GET
+@condition(etag_func=lookup_etag(Group, 'slug', group_feed))
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, group.posts.all())
+
+
+@require_GET
+@condition(etag_func=lookup_etag(User, 'username', author_feed))
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, author.posts.all())
+
+
+@require_GET
+@condition(etag_func=follow_etag)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Требуется авторизация.'}, status=401)
+    return feed_response(
+        request, Post.objects.filter(author__following__user=request.user))
+
+
+@require_GET
+@condition(etag_func=post_etag)
+def post_detail(request, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
+    comments = keyset_page(
+        post.comments.select_related('author').order_by(),
+        request.GET.get('cursor'),
+        per_page=API_PAGE_SIZE,
+        date_field='created',
+    )
+    next_url = None
+    if comments.next_cursor:
+        next_url = request.build_absolute_uri(
+            f'{request.path}?cursor={comments.next_cursor}')
+    return JsonResponse({
+        'post': serialize_post(post),
+        'comments': [serialize_comment(comment) for comment in comments],
+        'next': next_url,
+    })
+
+
+@require_GET
+def post_batch(request):
+    """Посты по списку id (?ids=1,2,3) в том же порядке за один вызов."""
+    try:
+        post_ids = [int(value) for value in
+                    request.GET.get('ids', '').split(',') if value]
+    except ValueError:
+        return JsonResponse(
+            {'detail': 'ids — список целых чисел через запятую.'},
+            status=400)
+    if any(not 1 <= pk <= MAX_POST_ID for pk in post_ids):
+        return JsonResponse(
+            {'detail': f'id должны быть от 1 до {MAX_POST_ID}.'},
+            status=400)
+    post_ids = list(dict.fromkeys(post_ids))
+    if len(post_ids) > MAX_BATCH_IDS:
+        return JsonResponse(
+            {'detail': f'Не больше {MAX_BATCH_IDS} id за запрос.'},
+            status=400)
+    posts = get_serialized_posts(post_ids)
+    return JsonResponse({
+        'results': [posts[pk] for pk in post_ids if pk in posts],
+        'missing': [pk for pk in post_ids if pk not in posts],
+    })
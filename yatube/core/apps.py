@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+
+        from .object_cache import object_cache
+
+        # Пользователь нужен CachedAuthenticationMiddleware на каждом запросе.
+        object_cache.register(get_user_model(), 'username')
@@ -0,0 +1,151 @@
+"""Двухуровневый кеш: LRU в памяти процесса перед общим файловым кешем.
+
+Общий уровень (L2) виден всем процессам сервера, локальный (L1) избавляет
+от чтения и разбора больших значений с диска. Вместе со значением в L2
+пишется штамп записи, а отдельно от него — ключ штампа. При чтении
+сначала читается только штамп: если он совпал со штампом копии в L1,
+значение берётся из памяти. Любая запись или удаление в одном процессе
+меняет штамп, и остальные процессы увидят это при следующем чтении.
+"""
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+L1_MAX_ENTRIES = 1000
+STAMP_SUFFIX = ':stamp'
+# Файл без суффикса .djcache: clear() и вытеснение его не удаляют.
+LOCK_FILE = 'update.lock'
+
+
+class TwoTierCache(BaseCache):
+    """Бэкенд кеша; LOCATION — каталог общего файлового кеша.
+
+    В OPTIONS можно задать L1_MAX_ENTRIES — сколько значений держать
+    в памяти процесса; остальные параметры передаются файловому кешу.
+    """
+
+    def __init__(self, location, params):
+        params = dict(params)
+        options = dict(params.get('OPTIONS', {}))
+        self.l1_max_entries = int(
+            options.pop('L1_MAX_ENTRIES', L1_MAX_ENTRIES))
+        params['OPTIONS'] = options
+        super().__init__(params)
+        self.shared = FileBasedCache(location, params)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _stamp_key(self, key):
+        return key + STAMP_SUFFIX
+
+    def _remember(self, full_key, stamp, value):
+        # В памяти хранится сериализованная копия: объект, отданный
+        # вызывающему коду, можно менять, не портя кеш.
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[full_key] = (stamp, data)
+            self._local.move_to_end(full_key)
+            while len(self._local) > self.l1_max_entries:
+                self._local.popitem(last=False)
+
+    def _forget(self, full_key):
+        with self._lock:
+            self._local.pop(full_key, None)
+
+    def get(self, key, default=None, version=None):
+        full_key = self.make_key(key, version)
+        stamp = self.shared.get(self._stamp_key(key), version=version)
+        if stamp is None:
+            self._forget(full_key)
+            return default
+        with self._lock:
+            local = self._local.get(full_key)
+            if local is not None and local[0] == stamp:
+                self._local.move_to_end(full_key)
+        if local is not None and local[0] == stamp:
+            return pickle.loads(local[1])
+        entry = self.shared.get(key, version=version)
+        if entry is None or entry[0] != stamp:
+            # Значение перезаписали между чтением штампа и данных.
+            return default
+        self._remember(full_key, stamp, entry[1])
+        return entry[1]
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        stamp = uuid.uuid4().hex
+        self.shared.set(key, (stamp, value), timeout, version=version)
+        self.shared.set(self._stamp_key(key), stamp, timeout,
+                        version=version)
+        self._remember(self.make_key(key, version), stamp, value)
+
+    @contextmanager
+    def exclusive(self):
+        """Блокировка общего каталога на время чтения и записи.
+
+        Делает add и incr атомарными для всех процессов сервера,
+        а не только для потоков одного процесса. Внутри блока можно
+        читать и писать ключи обычными get и set, но не вызывать add
+        и incr: блокировка не повторная.
+        """
+        os.makedirs(self.shared._dir, exist_ok=True)
+        with open(os.path.join(self.shared._dir, LOCK_FILE), 'ab') as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock)
+
+    def _remaining_timeout(self, key, version):
+        """Сколько осталось жить ключу — incr не должен продлевать срок."""
+        fname = self.shared._key_to_file(self._stamp_key(key), version)
+        try:
+            with open(fname, 'rb') as stored:
+                expiry = pickle.load(stored)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return DEFAULT_TIMEOUT
+        if expiry is None:
+            return None
+        return max(expiry - time.time(), 1)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self.exclusive():
+            if self.has_key(key, version=version):
+                return False
+            self.set(key, value, timeout, version=version)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        with self.exclusive():
+            value = self.get(key, version=version)
+            if value is None:
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            self.set(key, value, self._remaining_timeout(key, version),
+                     version=version)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = self.shared.touch(
+            self._stamp_key(key), timeout, version=version)
+        return self.shared.touch(key, timeout, version=version) and touched
+
+    def delete(self, key, version=None):
+        self.shared.delete(self._stamp_key(key), version=version)
+        self.shared.delete(key, version=version)
+        self._forget(self.make_key(key, version))
+
+    def has_key(self, key, version=None):
+        return self.shared.has_key(self._stamp_key(key), version=version)
+
+    def clear(self):
+        self.shared.clear()
+        with self._lock:
+            self._local.clear()
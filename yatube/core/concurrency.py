@@ -0,0 +1,76 @@
+"""Ограничение числа одновременно выполняемых запросов к тяжёлым view.
+
+Внутри процесса слоты — BoundedSemaphore. Если задан общий каталог,
+дополнительно нужен один из shared_limit файлов-слотов: слот занят, пока
+процесс держит блокировку файла, и освобождается даже при падении
+процесса, потому что блокировку снимает ОС. Запрос ждёт свободного слота
+не дольше queue_timeout, после чего его отклоняют.
+
+Общие слоты работают только на POSIX: django.core.files.locks в Django 2.2
+не сообщает, удалось ли взять блокировку без ожидания, поэтому
+используется fcntl.
+"""
+import fcntl
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+SLOT_POLL_INTERVAL = 0.01
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name, limit, queue_timeout=0.5, retry_after=1,
+                 shared_dir=None, shared_limit=None):
+        self.name = name
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self.shared_dir = shared_dir
+        self.shared_limit = shared_limit or limit
+
+    def _slot_path(self, number):
+        return os.path.join(self.shared_dir, f'{self.name}.{number}.slot')
+
+    def _take_slot(self, deadline):
+        os.makedirs(self.shared_dir, exist_ok=True)
+        while True:
+            for number in range(self.shared_limit):
+                slot = open(self._slot_path(number), 'ab')
+                try:
+                    fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    slot.close()
+                else:
+                    return slot
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(SLOT_POLL_INTERVAL)
+
+    def acquire(self):
+        """Занимает слот; возвращает его или None, если мест нет."""
+        deadline = time.monotonic() + self.queue_timeout
+        if not self._semaphore.acquire(timeout=self.queue_timeout):
+            return None
+        if self.shared_dir is None:
+            return True
+        slot = self._take_slot(deadline)
+        if slot is None:
+            self._semaphore.release()
+        return slot
+
+    def release(self, slot):
+        if slot is not True:
+            fcntl.flock(slot, fcntl.LOCK_UN)
+            slot.close()
+        self._semaphore.release()
+
+    @contextmanager
+    def slot(self):
+        """Контекст со слотом; внутри — None, если запрос надо отклонить."""
+        slot = self.acquire()
+        try:
+            yield slot
+        finally:
+            if slot is not None:
+                self.release(slot)
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.metrics import get_counts
+
+
+class Command(BaseCommand):
+    help = 'Показывает, сколько запросов сброшено по каждой группе view.'
+
+    def handle(self, *args, **options):
+        names = sorted(getattr(settings, 'CONCURRENCY_LIMITS', {}))
+        counts = get_counts(f'concurrency.{name}.shed' for name in names)
+        for name in names:
+            self.stdout.write(
+                f"{name}: {counts[f'concurrency.{name}.shed']} сброшено "
+                f"(лимит {settings.CONCURRENCY_LIMITS[name]['limit']})")
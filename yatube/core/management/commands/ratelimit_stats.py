@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.metrics import get_counts
+from core.ratelimit import rejected_metric
+
+
+class Command(BaseCommand):
+    help = 'Показывает, сколько запросов отклонено по каждому лимиту.'
+
+    def handle(self, *args, **options):
+        scopes = sorted(getattr(settings, 'RATELIMITS', {}))
+        counts = get_counts(rejected_metric(scope) for scope in scopes)
+        for scope in scopes:
+            self.stdout.write(
+                f'{scope}: {counts[rejected_metric(scope)]} отклонено '
+                f'(лимит {settings.RATELIMITS[scope]})')
@@ -0,0 +1,26 @@
+"""Счётчики событий в общем кеше: видны из всех процессов сервера."""
+from django.core.cache import cache
+
+METRICS_PREFIX = 'metrics'
+
+
+def _metric_key(name):
+    return f'{METRICS_PREFIX}:{name}'
+
+
+def increment(name, delta=1):
+    key = _metric_key(name)
+    cache.add(key, 0, None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Счётчик вытеснили между add и incr — начинаем заново.
+        cache.set(key, delta, None)
+        return delta
+
+
+def get_counts(names):
+    """Словарь {имя: значение}; отсутствующие счётчики равны нулю."""
+    keys = {_metric_key(name): name for name in names}
+    found = cache.get_many(list(keys))
+    return {name: found.get(key, 0) for key, name in keys.items()}
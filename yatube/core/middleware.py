@@ -0,0 +1,112 @@
+"""Middleware проекта.
+
+CachedAuthenticationMiddleware определяет пользователя запроса без
+обращения к базе.
+
+Сессия читается из кеша (SESSION_ENGINE = cached_db), а пользователь —
+из кеша объектов. Проверки те же, что у django.contrib.auth.get_user:
+бэкенд из сессии, активность пользователя и хеш пароля в сессии, так
+что смена пароля или деактивация сбрасывают кеш сигналом post_save
+и завершают остальные сессии на следующем запросе.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+from . import metrics
+from .concurrency import ConcurrencyLimiter
+from .object_cache import object_cache
+
+OVERLOAD_MESSAGE = 'Сервер перегружен, попробуйте через несколько секунд.'
+
+
+def get_cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = _resolve_user(request)
+    return request._cached_user
+
+
+def _resolve_user(request):
+    User = auth.get_user_model()
+    try:
+        user_id = User._meta.pk.to_python(request.session[auth.SESSION_KEY])
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+    if not issubclass(import_string(backend_path), ModelBackend):
+        # Чужие бэкенды могут хранить пользователей не в модели.
+        return auth.get_user(request)
+    user = object_cache.get(User, pk=user_id)
+    if user is None or not user.is_active:
+        return AnonymousUser()
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(
+            session_hash, user.get_session_auth_hash())):
+        request.session.flush()
+        return AnonymousUser()
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware, который берёт пользователя из кеша."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+
+
+class ConcurrencyLimitMiddleware:
+    """Сбрасывает нагрузку на тяжёлые view ответом 503.
+
+    Группы view и их лимиты задаются в settings.CONCURRENCY_LIMITS;
+    view группы делят общие слоты. Дешёвые запросы ограничение
+    не затрагивает, поэтому всплеск тяжёлых не оставляет их без
+    свободных потоков.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.limiters = {}
+        shared_dir = getattr(settings, 'CONCURRENCY_SHARED_DIR', None)
+        for name, options in getattr(
+                settings, 'CONCURRENCY_LIMITS', {}).items():
+            limiter = ConcurrencyLimiter(
+                name, options['limit'],
+                queue_timeout=options.get('queue_timeout', 0.5),
+                retry_after=options.get('retry_after', 1),
+                shared_dir=shared_dir,
+                shared_limit=options.get('shared_limit'))
+            for view_name in options['views']:
+                self.limiters[view_name] = limiter
+
+    def __call__(self, request):
+        limiter = self._limiter_for(request)
+        if limiter is None:
+            return self.get_response(request)
+        with limiter.slot() as slot:
+            if slot is None:
+                metrics.increment(f'concurrency.{limiter.name}.shed')
+                response = HttpResponse(
+                    OVERLOAD_MESSAGE, status=503,
+                    content_type='text/plain; charset=utf-8')
+                response['Retry-After'] = str(limiter.retry_after)
+                return response
+            return self.get_response(request)
+
+    def _limiter_for(self, request):
+        if not self.limiters:
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        return self.limiters.get(match.view_name)
@@ -0,0 +1,139 @@
+"""Кеш объектов моделей по первичному ключу и уникальным полям.
+
+Объект хранится в кеше под ключом с pk; для уникального поля (slug,
+username) хранится только pk, поэтому у объекта одна копия, и после
+переименования старое значение поля просто перестаёт совпадать. Записи
+модели сбрасываются сигналами post_save и post_delete, а изменения
+через QuerySet.update() нужно сбрасывать явно методом forget().
+
+Значение уникального поля входит в ключ в виде хеша: в slug и имени
+пользователя бывают пробелы и не-ASCII символы, недопустимые в ключах
+memcached.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.base import ModelState
+from django.db.models.signals import post_delete, post_save
+from django.http import Http404
+
+OBJECT_CACHE_TIMEOUT = 60 * 60
+
+
+class ObjectCache:
+    def __init__(self):
+        self._registry = {}
+
+    def register(self, model, *fields, timeout=OBJECT_CACHE_TIMEOUT):
+        """Кешировать модель; fields — уникальные поля для поиска."""
+        self._registry[model] = (fields, timeout)
+        uid = f'object_cache:{model._meta.label_lower}'
+        post_save.connect(self._invalidate, sender=model,
+                          dispatch_uid=uid, weak=False)
+        post_delete.connect(self._invalidate, sender=model,
+                            dispatch_uid=uid, weak=False)
+
+    def _key(self, model, field, value):
+        if field != 'pk':
+            value = hashlib.md5(str(value).encode()).hexdigest()
+        return f'object:{model._meta.label_lower}:{field}:{value}'
+
+    def _invalidate(self, sender, instance, **kwargs):
+        fields, _ = self._registry[sender]
+        keys = [self._key(sender, 'pk', instance.pk)] + [
+            self._key(sender, field, getattr(instance, field))
+            for field in fields]
+        # Второй сброс после коммита не даёт параллельному чтению
+        # закешировать строку в состоянии до нашей транзакции.
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+    def _detached(self, obj):
+        """Копия только с полями модели, без связанных объектов и аннотаций.
+
+        Для объекта, загруженного с defer() или only(), возвращает None:
+        неполная копия из кеша вызывала бы лишние запросы.
+        """
+        values = obj.__dict__
+        copy = type(obj).__new__(type(obj))
+        for field in obj._meta.concrete_fields:
+            if field.attname not in values:
+                return None
+            copy.__dict__[field.attname] = values[field.attname]
+        copy._state = ModelState()
+        copy._state.adding = False
+        copy._state.db = obj._state.db
+        return copy
+
+    def get(self, model, **lookup):
+        """Объект по pk или уникальному полю; None, если его нет."""
+        (field, value), = lookup.items()
+        if field in ('pk', 'id'):
+            return self.get_many(model, [value]).get(value)
+        key = self._key(model, field, value)
+        pk = cache.get(key)
+        if pk is not None:
+            obj = self.get_many(model, [pk]).get(pk)
+            if obj is not None and getattr(obj, field) == value:
+                return obj
+        obj = model._default_manager.filter(**lookup).first()
+        if obj is not None:
+            self.prime([obj])
+        return obj
+
+    def get_or_404(self, model, **lookup):
+        obj = self.get(model, **lookup)
+        if obj is None:
+            raise Http404(f'{model._meta.object_name} не найден')
+        return obj
+
+    def get_many(self, model, pks):
+        """Словарь {pk: объект}; промахи читаются одним запросом in_bulk."""
+        keys = {self._key(model, 'pk', pk): pk for pk in pks}
+        found = {keys[key]: obj
+                 for key, obj in cache.get_many(list(keys)).items()}
+        missing = [pk for pk in keys.values() if pk not in found]
+        if missing:
+            fresh = model._default_manager.in_bulk(missing)
+            self.prime(fresh.values())
+            found.update(fresh)
+        return found
+
+    def prime(self, objects):
+        """Кладёт в кеш уже загруженные объекты, например из QuerySet."""
+        objects = list(objects)
+        if not objects:
+            return
+        model = type(objects[0])
+        fields, timeout = self._registry[model]
+        values = {}
+        for obj in objects:
+            copy = self._detached(obj)
+            if copy is None:
+                continue
+            values[self._key(model, 'pk', obj.pk)] = copy
+            for field in fields:
+                values[self._key(model, field, getattr(obj, field))] = obj.pk
+        cache.set_many(values, timeout)
+
+    def forget(self, model, pks):
+        cache.delete_many([self._key(model, 'pk', pk) for pk in pks])
+
+    def attach(self, objects, *relations):
+        """Подставляет объектам связанные по ForeignKey объекты из кеша."""
+        objects = list(objects)
+        for name in relations:
+            field = objects[0]._meta.get_field(name) if objects else None
+            if field is None:
+                continue
+            ids = {getattr(obj, field.attname) for obj in objects} - {None}
+            related = self.get_many(field.related_model, ids)
+            for obj in objects:
+                related_obj = related.get(getattr(obj, field.attname))
+                if related_obj is not None:
+                    setattr(obj, name, related_obj)
+        return objects
+
+
+object_cache = ObjectCache()
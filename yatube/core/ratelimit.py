@@ -0,0 +1,103 @@
+"""Ограничение частоты запросов к «пишущим» view.
+
+Корзина жетонов в варианте GCRA: для каждой пары (view, пользователь
+или IP) в общем кеше хранится одно число — теоретическое время прихода
+следующего запроса (TAT). Каждый запрос сдвигает его на period/limit;
+если TAT уходит вперёд больше чем на period, корзина пуста. Жетоны
+пополняются равномерно, поэтому на стыке интервалов нельзя сделать
+вдвое больше запросов, как при счётчике на фиксированное окно.
+
+Чтение и запись TAT идут под блокировкой кеша (TwoTierCache.exclusive),
+общей для всех процессов; у бэкендов без неё — под блокировкой
+процесса. Лимиты задаются в settings.RATELIMITS как «число/интервал»,
+например '20/m'; отклонённые запросы считаются в core.metrics.
+"""
+import logging
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+from . import metrics
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+RATELIMIT_MESSAGE = 'Слишком много запросов, попробуйте позже.'
+
+logger = logging.getLogger(__name__)
+_process_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """'20/m' -> (20, 60); интервал может быть и числом секунд: '5/10'."""
+    count, period = rate.split('/')
+    seconds = PERIODS[period] if period in PERIODS else int(period)
+    return int(count), seconds
+
+
+def client_key(request):
+    """Пользователь, а для анонимов — IP-адрес."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def rejected_metric(scope):
+    return f'ratelimit.{scope}.rejected'
+
+
+def _exclusive():
+    exclusive = getattr(cache, 'exclusive', None)
+    return exclusive() if exclusive else _process_lock
+
+
+def take_token(scope, ident, limit, period):
+    """Берёт жетон; возвращает None или сколько секунд ждать новых."""
+    key = f'ratelimit:{scope}:{ident}'
+    # Время в целых миллисекундах: с float граница period «плывёт».
+    period_ms = period * 1000
+    interval = period_ms // limit
+    with _exclusive():
+        now = int(time.time() * 1000)
+        tat = max(cache.get(key, now), now) + interval
+        if tat - now > period_ms:
+            return max(math.ceil((tat - period_ms - now) / 1000), 1)
+        cache.set(key, tat, math.ceil((tat - now) / 1000))
+    return None
+
+
+def ratelimit(scope, methods=('POST',)):
+    """Декоратор view; лимит берётся из settings.RATELIMITS[scope].
+
+    Ставится под login_required, чтобы лимит считался на пользователя.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            rate = getattr(settings, 'RATELIMITS', {}).get(scope)
+            if rate and request.method in methods:
+                limit, period = parse_rate(rate)
+                retry_after = take_token(
+                    scope, client_key(request), limit, period)
+                if retry_after is not None:
+                    metrics.increment(rejected_metric(scope))
+                    logger.warning('Превышен лимит %s для %s', scope,
+                                   client_key(request))
+                    return too_many_requests(request, retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def too_many_requests(request, retry_after):
+    if (request.is_ajax()
+            or 'application/json' in request.META.get('HTTP_ACCEPT', '')):
+        response = JsonResponse({'detail': RATELIMIT_MESSAGE}, status=429)
+    else:
+        response = HttpResponse(RATELIMIT_MESSAGE, status=429,
+                                content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(retry_after)
+    return response
@@ -0,0 +1,28 @@
+import copy
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class IsolatedCacheRunner(DiscoverRunner):
+    """Запуск тестов с собственным временным каталогом кеша.
+
+    Тесты очищают кеш, а каталог из настроек общий с локально
+    запущенным сервером.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp(prefix='yatube_test_cache_')
+        caches = copy.deepcopy(settings.CACHES)
+        caches['default']['LOCATION'] = self.cache_dir
+        self.cache_override = override_settings(CACHES=caches)
+        self.cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_override.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
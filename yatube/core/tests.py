@@ -0,0 +1,164 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core.cache import TwoTierCache
+from core.concurrency import ConcurrencyLimiter
+from core.metrics import get_counts
+from core.middleware import ConcurrencyLimitMiddleware
+from core.ratelimit import ratelimit, rejected_metric, take_token
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        params = {'OPTIONS': {'L1_MAX_ENTRIES': 2}}
+        # Два экземпляра с общим каталогом — как два процесса сервера.
+        self.first = TwoTierCache(self.location, params)
+        self.second = TwoTierCache(self.location, params)
+
+    def test_invalidation_is_seen_by_other_process(self):
+        """Запись и удаление в одном процессе видны в другом."""
+        self.first.set('key', 'old')
+        self.assertEqual(self.second.get('key'), 'old')
+        self.first.set('key', 'new')
+        self.assertEqual(self.second.get('key'), 'new')
+        self.first.delete('key')
+        self.assertIsNone(self.second.get('key'))
+        self.second.set('counter', 1)
+        self.first.incr('counter')
+        self.assertEqual(self.second.get('counter'), 2)
+
+    def test_local_copy_is_used_and_bounded(self):
+        """Совпавший штамп отдаёт значение из памяти, LRU ограничен."""
+        self.first.set('key', ['value'])
+        self.first.shared.set('key', ('stale', ['from disk']))
+        self.assertEqual(self.first.get('key'), ['value'])
+        self.first.get('key').append('changed')
+        self.assertEqual(self.first.get('key'), ['value'])
+        self.first.set('other', 1)
+        self.first.set('third', 2)
+        self.assertEqual(len(self.first._local), 2)
+        self.assertNotIn(self.first.make_key('key'), self.first._local)
+        self.assertTrue(self.first.add('fresh', 1))
+        self.assertFalse(self.first.add('fresh', 2))
+
+    def test_incr_keeps_expiry(self):
+        """incr не делает временный ключ вечным и не продлевает его."""
+        self.first.set('window', 0, 30)
+        self.first.incr('window')
+        self.assertLessEqual(
+            self.first._remaining_timeout('window', None), 30)
+        self.first.set('generation', 1, None)
+        self.first.incr('generation')
+        self.assertIsNone(
+            self.first._remaining_timeout('generation', None))
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username='reader', password='secret-pass-1')
+        self.client.force_login(self.user)
+        self.url = reverse('about:author')
+
+    def test_user_is_resolved_without_queries(self):
+        """Сессия и пользователь берутся из кеша, база не нужна."""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_password_change_ends_session(self):
+        """После смены пароля кешированный пользователь не используется."""
+        self.client.get(self.url)
+        self.user.set_password('another-pass-2')
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertFalse(response.context['user'].is_authenticated)
+
+
+@override_settings(RATELIMITS={'test': '2/m'})
+class RateLimitTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_requests_over_limit_are_rejected(self):
+        """Третий запрос за минуту получает 429 и попадает в метрики."""
+        view = ratelimit('test')(lambda request: HttpResponse('ok'))
+        factory = RequestFactory()
+        statuses = []
+        for address in ('10.0.0.1', '10.0.0.1', '10.0.0.1', '10.0.0.2'):
+            request = factory.post('/', REMOTE_ADDR=address)
+            request.user = AnonymousUser()
+            statuses.append(view(request))
+        self.assertEqual([response.status_code for response in statuses],
+                         [200, 200, 429, 200])
+        self.assertGreaterEqual(int(statuses[2]['Retry-After']), 1)
+        self.assertEqual(
+            get_counts([rejected_metric('test')])[rejected_metric('test')],
+            1)
+        # GET в этом view не ограничивается.
+        request = factory.get('/', REMOTE_ADDR='10.0.0.1')
+        request.user = AnonymousUser()
+        self.assertEqual(view(request).status_code, 200)
+
+    def test_tokens_refill_evenly(self):
+        """На стыке минут лимит не удваивается, жетоны копятся постепенно."""
+        moments = [59.9, 59.9, 60.1, 89.0, 90.1, 90.2]
+        with mock.patch('core.ratelimit.time') as clock:
+            clock.time.side_effect = moments
+            results = [take_token('test', 'ip:1', 2, 60) for _ in moments]
+        self.assertEqual(results, [None, None, 30, 1, None, 30])
+
+
+class ConcurrencyLimitTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.shared_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.shared_dir, ignore_errors=True)
+
+    def test_shared_slots_limit_all_processes(self):
+        """Общие слоты ограничивают и другие процессы с тем же каталогом."""
+        first = ConcurrencyLimiter('test', 2, queue_timeout=0,
+                                   shared_dir=self.shared_dir, shared_limit=1)
+        second = ConcurrencyLimiter('test', 2, queue_timeout=0,
+                                    shared_dir=self.shared_dir,
+                                    shared_limit=1)
+        slot = first.acquire()
+        self.assertIsNotNone(slot)
+        self.assertIsNone(second.acquire())
+        first.release(slot)
+        slot = second.acquire()
+        self.assertIsNotNone(slot)
+        second.release(slot)
+
+    @override_settings(CONCURRENCY_LIMITS={'test': {
+        'views': ['posts:profile'], 'limit': 1, 'queue_timeout': 0,
+        'retry_after': 3}})
+    def test_excess_requests_are_shed(self):
+        """Сверх лимита — 503 с Retry-After; другие view не затронуты."""
+        middleware = ConcurrencyLimitMiddleware(
+            lambda request: HttpResponse('ok'))
+        factory = RequestFactory()
+        profile = factory.get(reverse('posts:profile', args=['someone']))
+        with middleware.limiters['posts:profile'].slot():
+            response = middleware(profile)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '3')
+            other = factory.get(reverse('posts:index'))
+            self.assertEqual(middleware(other).status_code, 200)
+        self.assertEqual(middleware(profile).status_code, 200)
+        self.assertEqual(
+            get_counts(['concurrency.test.shed'])['concurrency.test.shed'],
+            1)
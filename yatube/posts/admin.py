@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Group, Post, Comment
+from .models import Group, Post, Comment, TextFingerprint
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -18,6 +18,14 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class TextFingerprintAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'author', 'post', 'comment', 'flagged', 'created')
+    list_filter = ('flagged', 'created')
+    raw_id_fields = ('author', 'post', 'comment')
+    exclude = ('signature',)
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment)
+admin.site.register(TextFingerprint, TextFingerprintAdmin)
@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from core.object_cache import object_cache
+
+        from . import signals  # noqa: F401
+        from .models import Group, Post
+
+        object_cache.register(Post)
+        object_cache.register(Group, 'slug')
@@ -0,0 +1,155 @@
+"""Поиск почти одинаковых текстов: MinHash и LSH.
+
+Текст разбивается на шинглы — тройки соседних слов. MinHash-подпись —
+NUM_HASHES минимумов хешей шинглов, по одному на каждую маску; доля
+совпавших позиций двух подписей оценивает коэффициент Жаккара их
+множеств шинглов. Подпись режется на BANDS полос, хеш каждой полосы —
+корзина в индексированной таблице TextBand. Кандидаты в дубли — тексты
+с общей корзиной, их находит один запрос по индексу, сколько бы
+подписей ни хранилось; точное сравнение идёт только с ними.
+"""
+import hashlib
+import random
+import re
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import TextBand, TextFingerprint
+
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE_SIZE = 3
+# Короткие тексты («Спасибо!») совпадают у разных людей без всякого спама.
+MIN_WORDS = 8
+DUPLICATE_THRESHOLD = 0.8
+# Сколько разных авторов одного текста уже считается рассылкой.
+SPAM_AUTHORS = 3
+DUPLICATE_WINDOW = timedelta(days=7)
+MAX_CANDIDATES = 100
+HASH_MASK = (1 << 64) - 1
+
+WORD_RE = re.compile(r'\w+')
+_masks = random.Random(20240101)
+MASKS = [_masks.getrandbits(64) for _ in range(NUM_HASHES)]
+
+DUPLICATE_MESSAGE = 'Вы уже публиковали почти такой же текст.'
+SPAM_MESSAGE = 'Такой текст уже разослан несколькими авторами.'
+
+
+def _hash(value):
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+def minhash(text):
+    """Подпись текста или None, если текст слишком короткий."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    hashes = {_hash(' '.join(words[i:i + SHINGLE_SIZE]))
+              for i in range(len(words) - SHINGLE_SIZE + 1)}
+    # Вместо NUM_HASHES разных хеш-функций — один хеш шингла и XOR
+    # со случайными масками: минимумы почти независимы, а считать
+    # приходится только один blake2b на шингл.
+    return [min(value ^ mask for value in hashes) for mask in MASKS]
+
+
+def band_buckets(signature):
+    """Хеши полос подписи; номер полосы входит в хеш."""
+    buckets = []
+    for band in range(BANDS):
+        values = signature[band * ROWS:(band + 1) * ROWS]
+        raw = f'{band}:' + ','.join(map(str, values))
+        # Знаковое 64-битное число помещается в BigIntegerField.
+        value = _hash(raw)
+        buckets.append(value - (1 << 64) if value >= 1 << 63 else value)
+    return buckets
+
+
+def pack(signature):
+    return b''.join(value.to_bytes(8, 'big') for value in signature)
+
+
+def unpack(data):
+    data = bytes(data)
+    return [int.from_bytes(data[i:i + 8], 'big')
+            for i in range(0, len(data), 8)]
+
+
+def similarity(first, second):
+    return sum(a == b for a, b in zip(first, second)) / NUM_HASHES
+
+
+class DuplicateCheck:
+    """Результат проверки текста перед сохранением."""
+
+    def __init__(self, signature, author, duplicates):
+        self.signature = signature
+        self.author = author
+        self.same_author = any(
+            author_id == author.pk for author_id in duplicates)
+        self.other_authors = set(duplicates) - {author.pk}
+
+    @property
+    def message(self):
+        if self.same_author:
+            return DUPLICATE_MESSAGE
+        if len(self.other_authors) + 1 >= SPAM_AUTHORS:
+            return SPAM_MESSAGE
+        return None
+
+    @property
+    def flagged(self):
+        return bool(self.other_authors)
+
+
+def check_text(text, author, exclude_post=None):
+    """Ищет недавние почти одинаковые тексты; None для коротких текстов.
+
+    exclude_post — редактируемый пост: с собственной прежней подписью
+    его текст не сравнивается.
+    """
+    signature = minhash(text)
+    if signature is None:
+        return None
+    candidates = TextBand.objects.filter(
+        bucket__in=band_buckets(signature),
+        fingerprint__created__gte=timezone.now() - DUPLICATE_WINDOW)
+    if exclude_post is not None:
+        candidates = candidates.exclude(
+            fingerprint__post=exclude_post,
+            fingerprint__comment__isnull=True)
+    candidates = (
+        candidates
+        .values_list('fingerprint_id', 'fingerprint__author_id',
+                     'fingerprint__signature')
+        .distinct()[:MAX_CANDIDATES]
+    )
+    duplicates = [
+        author_id for _, author_id, data in candidates
+        if similarity(signature, unpack(data)) >= DUPLICATE_THRESHOLD
+    ]
+    return DuplicateCheck(signature, author, duplicates)
+
+
+def remember_text(check, post=None, comment=None):
+    """Сохраняет подпись принятого текста и её корзины."""
+    if check is None:
+        return None
+    fingerprint = TextFingerprint.objects.create(
+        author=check.author, post=post, comment=comment,
+        signature=pack(check.signature), flagged=check.flagged)
+    TextBand.objects.bulk_create(
+        TextBand(fingerprint=fingerprint, bucket=bucket)
+        for bucket in band_buckets(check.signature))
+    return fingerprint
+
+
+def replace_text(check, post):
+    """Заменяет подпись отредактированного поста новой."""
+    with transaction.atomic():
+        TextFingerprint.objects.filter(post=post, comment=None).delete()
+        return remember_text(check, post=post)
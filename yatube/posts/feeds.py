@@ -0,0 +1,109 @@
+"""Ключи лент и счётчики поколений для кеширования.
+
+Лента — это набор постов, который показывается постранично:
+главная, группа, автор и подписки пользователя; отдельной лентой
+считается и страница поста с комментариями. У каждой ленты есть
+счётчик поколения в кеше; любое изменение постов ленты увеличивает его,
+поэтому всё, что закешировано с номером поколения в ключе, устаревает
+само собой без перебора ключей.
+
+Лента подписок своего счётчика для постов не имеет: её поколение
+собирается из поколения подписок пользователя и поколений лент авторов,
+на которых он подписан (combined_generation). Так новый пост меняет
+один счётчик автора, а не по счётчику на каждого подписчика.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+
+GENERATION_PREFIX = 'feed_gen'
+COUNT_PREFIX = 'feed_count'
+COUNT_TIMEOUT = 60 * 60
+ESTIMATED_COUNT_TIMEOUT = 5 * 60
+INDEX_FEED = 'index'
+# Имена авторов и названия групп: они видны в любой ленте, поэтому
+# их изменение (редкое) сбрасывает все закешированные по нему ответы.
+NAMES_FEED = 'names'
+# Поля пользователя, которые показываются рядом с его постами.
+AUTHOR_NAME_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def follow_feed(user_id):
+    """Подписки пользователя; меняется при подписке и отписке."""
+    return f'follow:{user_id}'
+
+
+def post_feed(post_id):
+    """Страница поста: сам пост и комментарии к нему."""
+    return f'post:{post_id}'
+
+
+def likes_feed(user_id):
+    """Лайки пользователя: от них зависит вид кнопок на его страницах."""
+    return f'likes:{user_id}'
+
+
+def author_likes_feed(author_id):
+    """Лайки постов автора: от них зависят счётчики ♥ в его профиле."""
+    return f'author_likes:{author_id}'
+
+
+def _generation_key(feed):
+    return f'{GENERATION_PREFIX}:{feed}'
+
+
+def _initial_generation():
+    # Начинаем с отметки времени, а не с единицы: если счётчик вытеснят
+    # из кеша, новое поколение не совпадёт ни с одним из старых.
+    return int(time.time() * 1000)
+
+
+def get_generations(feeds):
+    """Возвращает словарь {лента: поколение} за один запрос к кешу."""
+    keys = {_generation_key(feed): feed for feed in feeds}
+    found = cache.get_many(list(keys))
+    missing = {
+        key: _initial_generation() for key in keys if key not in found
+    }
+    for key, value in missing.items():
+        cache.add(key, value, None)
+    if missing:
+        found.update(cache.get_many(list(missing)))
+    return {feed: found.get(key, missing.get(key))
+            for key, feed in keys.items()}
+
+
+def get_generation(feed):
+    return get_generations([feed])[feed]
+
+
+def combined_generation(feeds):
+    """Одно поколение для набора лент: меняется вместе с любой из них."""
+    generations = get_generations(feeds)
+    if len(generations) == 1:
+        return generations[feeds[0]]
+    raw = ','.join(str(generations[feed]) for feed in feeds)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def bump_generations(feeds):
+    """Делает устаревшими все кеши, привязанные к поколениям лент."""
+    for feed in set(feeds):
+        key = _generation_key(feed)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_generation(), None)
+
+
+def count_key(feed, generation):
+    return f'{COUNT_PREFIX}:{feed}:{generation}'
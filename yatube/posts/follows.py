@@ -0,0 +1,56 @@
+"""Множество авторов, на которых подписан пользователь, в кеше.
+
+Множество хранится одним значением на пользователя и сбрасывается
+сигналами при подписке и отписке, поэтому проверка «подписан ли я на
+автора» для страницы с любым числом авторов — одно чтение кеша.
+"""
+from array import array
+
+from django.core.cache import cache
+
+from .feeds import author_feed, follow_feed
+from .models import Follow
+
+FOLLOWING_TIMEOUT = 24 * 60 * 60
+
+
+def _following_key(user_id):
+    return f'following:{user_id}'
+
+
+def following_ids(user):
+    """frozenset id авторов, на которых подписан пользователь."""
+    if not user.is_authenticated:
+        return frozenset()
+    key = _following_key(user.pk)
+    packed = cache.get(key)
+    if packed is None:
+        # Отсортированный массив чисел занимает в кеше меньше, чем set.
+        packed = array('q', sorted(
+            Follow.objects.filter(user=user)
+            .values_list('author_id', flat=True))).tobytes()
+        cache.set(key, packed, FOLLOWING_TIMEOUT)
+    return frozenset(array('q', packed))
+
+
+def is_following(user, author):
+    return author.pk in following_ids(user)
+
+
+def follow_feeds(user):
+    """Ленты, из поколений которых складывается лента подписок."""
+    return [follow_feed(user.pk)] + [
+        author_feed(author_id) for author_id in sorted(following_ids(user))]
+
+
+def forget_following(user_id):
+    cache.delete(_following_key(user_id))
+
+
+def annotate_following(posts, user):
+    """Добавляет постам атрибут author_followed для кнопок и отметок."""
+    posts = list(posts)
+    followed = following_ids(user)
+    for post in posts:
+        post.author_followed = post.author_id in followed
+    return posts
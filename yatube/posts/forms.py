@@ -1,9 +1,37 @@
 from django import forms
 
+from .duplicates import check_text
 from .models import Comment, Post
 
 
-class PostForm(forms.ModelForm):
+class DuplicateCheckMixin:
+    """Отклоняет текст, почти совпадающий с недавними текстами.
+
+    Проверка идёт, только если форме передан author; результат остаётся
+    в duplicate_check, чтобы после сохранения запомнить подпись текста.
+    При редактировании поста его прежняя подпись в сравнении не участвует.
+    """
+
+    def __init__(self, *args, author=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.author = author
+        self.duplicate_check = None
+
+    def clean_text(self):
+        text = self.cleaned_data['text']
+        if self.author is not None:
+            edited = self.instance
+            exclude_post = (edited if isinstance(edited, Post) and edited.pk
+                            else None)
+            self.duplicate_check = check_text(
+                text, self.author, exclude_post=exclude_post)
+            message = self.duplicate_check and self.duplicate_check.message
+            if message:
+                raise forms.ValidationError(message)
+        return text
+
+
+class PostForm(DuplicateCheckMixin, forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -18,7 +46,7 @@ class PostForm(forms.ModelForm):
         }
 
 
-class CommentForm(forms.ModelForm):
+class CommentForm(DuplicateCheckMixin, forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
@@ -0,0 +1,42 @@
+"""Поддержка обратного индекса хештегов в актуальном состоянии."""
+from .markup import extract_hashtags
+from .models import Tag, TaggedPost
+
+
+def get_or_create_tags(names):
+    """Словарь {имя: id} для хештегов, недостающие создаются пачкой."""
+    names = set(names)
+    if not names:
+        return {}
+    tags = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = names - tags.keys()
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in missing], ignore_conflicts=True)
+        tags.update(
+            Tag.objects.filter(name__in=missing).values_list('name', 'id'))
+    return tags
+
+
+def sync_post_tags(post, previous_text=None):
+    """Обновляет индекс по разнице хештегов старого и нового текста.
+
+    Для нового поста previous_text не передаётся, и все его хештеги
+    добавляются без чтения индекса.
+    """
+    new_names = extract_hashtags(post.text)
+    if previous_text is None:
+        old_names = set()
+    else:
+        old_names = extract_hashtags(previous_text)
+    removed = old_names - new_names
+    added = new_names - old_names
+    if removed:
+        TaggedPost.objects.filter(post=post, tag__name__in=removed).delete()
+    if added:
+        tags = get_or_create_tags(added)
+        TaggedPost.objects.bulk_create(
+            [TaggedPost(tag_id=tag_id, post=post, pub_date=post.pub_date)
+             for tag_id in tags.values()],
+            ignore_conflicts=True,
+        )
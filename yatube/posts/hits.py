@@ -0,0 +1,94 @@
+"""Буфер просмотров постов.
+
+Просмотр не пишет в базу: счётчик увеличивается в памяти процесса,
+а фоновый поток раз в POST_VIEWS_FLUSH_INTERVAL секунд записывает все
+накопленные просмотры одним UPDATE ... CASE на пачку постов. При падении
+процесса несброшенные просмотры теряются — это допустимая цена за то,
+что запрос страницы никогда не ждёт записи.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Case, F, IntegerField, Value, When
+
+from core.object_cache import object_cache
+
+from .models import Post
+
+FLUSH_BATCH_SIZE = 500
+# Сколько разных постов можно держать в буфере; сверх этого просмотры
+# отбрасываются, чтобы буфер не рос без ограничений, если база недоступна.
+MAX_PENDING_POSTS = 50_000
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounterBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._thread = None
+
+    def hit(self, post_id):
+        with self._lock:
+            if (post_id in self._pending
+                    or len(self._pending) < MAX_PENDING_POSTS):
+                self._pending[post_id] += 1
+        self._start_flusher()
+
+    def pending(self, post_id):
+        with self._lock:
+            return self._pending[post_id]
+
+    def flush(self):
+        """Записывает накопленные просмотры; возвращает число постов."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        items = list(pending.items())
+        for start in range(0, len(items), FLUSH_BATCH_SIZE):
+            batch = items[start:start + FLUSH_BATCH_SIZE]
+            increment = Case(
+                *[When(pk=post_id, then=Value(count))
+                  for post_id, count in batch],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+            try:
+                Post.objects.filter(
+                    pk__in=[post_id for post_id, _ in batch]
+                ).update(views=F('views') + increment)
+                object_cache.forget(Post, [post_id for post_id, _ in batch])
+            except DatabaseError:
+                logger.warning('Потеряны просмотры %d постов', len(batch),
+                               exc_info=True)
+        return len(items)
+
+    def _start_flusher(self):
+        interval = settings.POST_VIEWS_FLUSH_INTERVAL
+        if not interval or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, args=(interval,),
+                    name='post-views-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось сбросить просмотры постов')
+            finally:
+                # У потока своё соединение с базой, держать его открытым
+                # между сбросами незачем.
+                connection.close()
+
+
+view_counter = ViewCounterBuffer()
@@ -0,0 +1,96 @@
+"""Лайки постов: запись в шардированные счётчики и чтение через кеш."""
+import random
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .feeds import author_likes_feed, bump_generations, likes_feed
+from .models import Like, LikeCounter
+
+LIKE_SHARDS = 8
+LIKE_COUNT_TIMEOUT = 10 * 60
+
+
+def _count_key(post_id):
+    return f'like_count:{post_id}'
+
+
+def _add_to_counter(post_id, delta):
+    shard = random.randrange(LIKE_SHARDS)
+    counter = LikeCounter.objects.filter(post_id=post_id, shard=shard)
+    if not counter.update(count=F('count') + delta):
+        LikeCounter.objects.bulk_create(
+            [LikeCounter(post_id=post_id, shard=shard)],
+            ignore_conflicts=True)
+        counter.update(count=F('count') + delta)
+    # Второй сброс после коммита не даёт параллельному чтению закешировать
+    # сумму, посчитанную до нашей транзакции.
+    key = _count_key(post_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def like(user, post):
+    """Ставит лайк; повторный вызов ничего не меняет."""
+    with transaction.atomic():
+        _, created = Like.objects.get_or_create(user=user, post=post)
+        if created:
+            _add_to_counter(post.pk, 1)
+    if created:
+        bump_generations(
+            [likes_feed(user.pk), author_likes_feed(post.author_id)])
+    return created
+
+
+def unlike(user, post):
+    """Снимает лайк; если его не было, ничего не меняет."""
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, post=post).delete()
+        if deleted:
+            _add_to_counter(post.pk, -1)
+    if deleted:
+        bump_generations(
+            [likes_feed(user.pk), author_likes_feed(post.author_id)])
+    return bool(deleted)
+
+
+def get_like_counts(post_ids):
+    """Словарь {id поста: лайков}; промахи кеша суммируются одним запросом."""
+    keys = {_count_key(post_id): post_id for post_id in post_ids}
+    cached = cache.get_many(list(keys))
+    counts = {keys[key]: value for key, value in cached.items()}
+    missing = [post_id for post_id in post_ids if post_id not in counts]
+    if missing:
+        totals = dict(
+            LikeCounter.objects.filter(post_id__in=missing)
+            .values_list('post_id')
+            .annotate(total=Sum('count'))
+        )
+        fresh = {post_id: totals.get(post_id, 0) for post_id in missing}
+        cache.set_many(
+            {_count_key(post_id): value for post_id, value in fresh.items()},
+            LIKE_COUNT_TIMEOUT)
+        counts.update(fresh)
+    return counts
+
+
+def liked_post_ids(user, post_ids):
+    """Какие из постов лайкнул пользователь — одним запросом на страницу."""
+    if not user.is_authenticated or not post_ids:
+        return set()
+    return set(
+        Like.objects.filter(user=user, post_id__in=post_ids)
+        .values_list('post_id', flat=True))
+
+
+def annotate_likes(posts, user):
+    """Добавляет постам страницы атрибуты like_count и is_liked."""
+    posts = list(posts)
+    post_ids = [post.pk for post in posts]
+    counts = get_like_counts(post_ids)
+    liked = liked_post_ids(user, post_ids)
+    for post in posts:
+        post.like_count = counts[post.pk]
+        post.is_liked = post.pk in liked
+    return posts
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import (SUGGESTIONS_PER_USER, USER_CHUNK,
+                                   build_suggestions)
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «на кого подписаться».'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=SUGGESTIONS_PER_USER,
+            help='Сколько авторов рекомендовать каждому пользователю.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=USER_CHUNK,
+            help='Сколько пользователей обрабатывать за одну транзакцию.')
+
+    def handle(self, *args, limit, chunk_size, **options):
+        written = build_suggestions(limit=limit, chunk_size=chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано рекомендаций: {written}'))
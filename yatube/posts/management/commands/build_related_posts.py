@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts.related import (BLOCK_SIZE, RELATED_PER_POST, index_new_posts,
+                           rebuild_related)
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает похожие посты по TF-IDF; с --new только '
+            'добавляет новые посты по существующему словарю.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--new', action='store_true',
+            help='Проиндексировать только посты, добавленные после '
+                 'последнего пересчёта.')
+        parser.add_argument(
+            '--limit', type=int, default=RELATED_PER_POST,
+            help='Сколько похожих постов хранить для каждого поста.')
+        parser.add_argument(
+            '--block-size', type=int, default=BLOCK_SIZE,
+            help='Сколько постов обрабатывать за одну транзакцию.')
+
+    def handle(self, *args, new, limit, block_size, **options):
+        if new:
+            count = index_new_posts(limit=limit)
+        else:
+            count = rebuild_related(limit=limit, block_size=block_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано постов: {count}'))
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.sitemaps import SITEMAP_CHUNK, build_sitemaps
+
+
+class Command(BaseCommand):
+    help = ('Обновляет статические файлы sitemap: перезаписываются только '
+            'куски, в которых изменились строки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=SITEMAP_CHUNK,
+            help='Сколько id охватывает один файл sitemap.')
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Перезаписать все файлы, не сверяясь с manifest.json.')
+
+    def handle(self, *args, chunk_size, full, **options):
+        written, total = build_sitemaps(
+            settings.SITEMAP_ROOT, settings.SITEMAP_BASE_URL,
+            settings.SITEMAP_URL, chunk_size=chunk_size, full=full)
+        self.stdout.write(self.style.SUCCESS(
+            f'Перезаписано файлов sitemap: {written} из {total}'))
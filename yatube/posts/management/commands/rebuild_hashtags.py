@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.hashtags import get_or_create_tags
+from posts.markup import extract_hashtags
+from posts.models import Post, Tag, TaggedPost
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает индекс хештегов по тексту всех постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Сколько постов читать из базы за один запрос.')
+
+    def handle(self, *args, batch_size, **options):
+        last_pk = 0
+        processed = indexed = 0
+        while True:
+            # Читаем посты порциями по первичному ключу, чтобы не держать
+            # в памяти всю таблицу и не сканировать её через OFFSET.
+            batch = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', 'pub_date', 'text')[:batch_size]
+            )
+            if not batch:
+                break
+            tagged = [(pk, pub_date, extract_hashtags(text))
+                      for pk, pub_date, text in batch]
+            tags = get_or_create_tags(
+                name for _, _, names in tagged for name in names)
+            rows = [
+                TaggedPost(tag_id=tags[name], post_id=pk, pub_date=pub_date)
+                for pk, pub_date, names in tagged for name in names
+            ]
+            # Диапазон id заменяется целиком одной транзакцией: ленты
+            # тегов во время перестройки не пустеют, а при сбое у ещё
+            # не обработанных постов остаётся прежний индекс.
+            with transaction.atomic():
+                TaggedPost.objects.filter(
+                    post_id__gt=last_pk, post_id__lte=batch[-1][0]).delete()
+                TaggedPost.objects.bulk_create(rows, ignore_conflicts=True)
+            last_pk = batch[-1][0]
+            processed += len(batch)
+            indexed += len(rows)
+        TaggedPost.objects.filter(post_id__gt=last_pk).delete()
+        # Теги, которые больше не встречаются ни в одном посте.
+        Tag.objects.filter(tagged_posts__isnull=True).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано постов: {processed}, записей индекса: {indexed}'))
@@ -0,0 +1,124 @@
+"""Преобразование текста постов и комментариев в безопасный HTML.
+
+Текст экранируется, ссылки, #хештеги и @упоминания превращаются в теги <a>,
+поддерживается простая разметка (**жирный**, *курсив*, `код`)
+и переносы строк.
+Результат сохраняется в модели при записи, а для текста без готового
+HTML кешируется по хешу содержимого, поэтому регулярные выражения
+не запускаются при каждом показе ленты.
+"""
+import hashlib
+import re
+
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+# Меняется при любом изменении правил, чтобы не отдавать старый кеш.
+RENDERER_VERSION = 3
+RENDER_CACHE_TIMEOUT = 24 * 60 * 60
+MAX_LINK_TEXT = 60
+MAX_TAG_LENGTH = 64
+MAX_MENTIONS = 50
+
+URL_RE = re.compile(r'\bhttps?://[^\s<>"\']+', re.IGNORECASE)
+# Знаки препинания в конце ссылки обычно относятся к предложению.
+URL_TRAILING = '.,:;!?)'
+INLINE_RULES = (
+    (re.compile(r'`([^`\n]+)`'), r'<code>\1</code>'),
+    (re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*'), r'<strong>\1</strong>'),
+    (re.compile(r'(?<![\w*])\*(?=\S)([^*\n]+?)(?<=\S)\*(?![\w*])'),
+     r'<em>\1</em>'),
+)
+PARAGRAPH_RE = re.compile(r'\n\s*\n')
+# Решётка внутри слова или HTML-сущности (&#x27;) тегом не считается.
+HASHTAG_RE = re.compile(r'(?<![\w&#])#(\w{1,%d})(?!\w)' % MAX_TAG_LENGTH)
+# Имя пользователя Django: буквы, цифры и .@+-_, но не в конце упоминания,
+# чтобы точка или запятая после имени к нему не прилипали.
+MENTION_RE = re.compile(r'(?<![\w@/])@(\w(?:[\w.@+-]{0,148}\w)?)')
+
+
+def extract_hashtags(text):
+    """Множество хештегов текста в нижнем регистре, без учёта ссылок."""
+    return {tag.lower() for tag in HASHTAG_RE.findall(URL_RE.sub(' ', text))}
+
+
+def extract_mentions(text):
+    """Имена пользователей, упомянутых в тексте (не больше MAX_MENTIONS)."""
+    names = []
+    for name in MENTION_RE.findall(URL_RE.sub(' ', text)):
+        if name not in names:
+            names.append(name)
+    return set(names[:MAX_MENTIONS])
+
+
+def _render_hashtag(match):
+    name = match.group(1)
+    url = reverse('posts:tag_posts', args=[name.lower()])
+    return f'<a href="{escape(url)}">#{name}</a>'
+
+
+def _render_link(url):
+    trailing = ''
+    while url and url[-1] in URL_TRAILING:
+        trailing = url[-1] + trailing
+        url = url[:-1]
+    label = url if len(url) <= MAX_LINK_TEXT else url[:MAX_LINK_TEXT] + '…'
+    return (f'<a href="{escape(url)}" rel="nofollow noopener" '
+            f'target="_blank">{escape(label)}</a>{escape(trailing)}')
+
+
+def _render_mention(match, mentions):
+    name = match.group(1)
+    if name not in mentions:
+        return match.group()
+    url = reverse('posts:profile', args=[name])
+    return f'<a href="{escape(url)}">@{name}</a>'
+
+
+def _render_plain(text, mentions):
+    html = escape(text)
+    for pattern, replacement in INLINE_RULES:
+        html = pattern.sub(replacement, html)
+    html = HASHTAG_RE.sub(_render_hashtag, html)
+    if mentions:
+        html = MENTION_RE.sub(
+            lambda match: _render_mention(match, mentions), html)
+    return html
+
+
+def _render_paragraph(text, mentions):
+    parts = []
+    position = 0
+    for match in URL_RE.finditer(text):
+        parts.append(_render_plain(text[position:match.start()], mentions))
+        parts.append(_render_link(match.group()))
+        position = match.end()
+    parts.append(_render_plain(text[position:], mentions))
+    return ''.join(parts).replace('\n', '<br>')
+
+
+def render_text(text, mentions=()):
+    """Возвращает безопасный HTML для текста поста или комментария.
+
+    Ссылками становятся только упоминания из mentions — имена, которые
+    уже проверены по базе одним запросом перед рендером.
+    """
+    text = text.replace('\r\n', '\n').strip()
+    paragraphs = [
+        _render_paragraph(paragraph, mentions)
+        for paragraph in PARAGRAPH_RE.split(text) if paragraph.strip()
+    ]
+    return mark_safe(''.join(f'<p>{p}</p>' for p in paragraphs))
+
+
+def render_cached(text):
+    """Рендер с кешем по хешу содержимого для текста без готового HTML."""
+    digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    key = f'markup:{RENDERER_VERSION}:{digest}'
+    html = cache.get(key)
+    if html is None:
+        html = render_text(text)
+        cache.set(key, str(html), RENDER_CACHE_TIMEOUT)
+    return mark_safe(html)
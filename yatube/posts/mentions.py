@@ -0,0 +1,21 @@
+"""Поддержка таблицы упоминаний в актуальном состоянии."""
+from .models import Mention
+
+
+def sync_mentions(post, user_ids, comment=None):
+    """Приводит упоминания поста или комментария к набору user_ids.
+
+    Автор не получает уведомлений об упоминании самого себя.
+    """
+    author_id = (comment or post).author_id
+    user_ids = set(user_ids) - {author_id}
+    mentions = Mention.objects.filter(post=post, comment=comment)
+    existing = set(mentions.values_list('user_id', flat=True))
+    if existing - user_ids:
+        mentions.filter(user_id__in=existing - user_ids).delete()
+    if user_ids - existing:
+        Mention.objects.bulk_create(
+            [Mention(user_id=user_id, post=post, comment=comment)
+             for user_id in user_ids - existing],
+            ignore_conflicts=True,
+        )
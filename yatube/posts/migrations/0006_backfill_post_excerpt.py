@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-19 19:46
+
+from django.db import migrations
+from django.utils.text import Truncator
+
+EXCERPT_LENGTH = 300
+CHUNK_SIZE = 500
+
+
+def backfill_excerpts(apps, schema_editor):
+    """Заполняет отрывки существующих постов порциями по первичному ключу."""
+    Post = apps.get_model('posts', 'Post')
+    last_pk = 0
+    while True:
+        chunk = list(
+            Post.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', 'text')[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        for post in chunk:
+            post.excerpt = Truncator(post.text).chars(EXCERPT_LENGTH)
+        Post.objects.bulk_update(chunk, ['excerpt'])
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
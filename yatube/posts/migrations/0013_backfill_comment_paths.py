@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-19 19:54
+
+from django.db import migrations
+
+PATH_STEP = 10
+CHUNK_SIZE = 500
+
+
+def backfill_paths(apps, schema_editor):
+    """До веток все комментарии были корневыми: путь — это их id."""
+    Comment = apps.get_model('posts', 'Comment')
+    last_pk = 0
+    while True:
+        chunk = list(
+            Comment.objects.filter(pk__gt=last_pk, path='')
+            .order_by('pk')
+            .only('pk')[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        for comment in chunk:
+            comment.path = f'{comment.pk:0{PATH_STEP}d}'
+        Comment.objects.bulk_update(chunk, ['path'])
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_comment_threads'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,19 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils.text import Truncator
 
 from core.models import CreatedModel
 
+from .markup import MAX_TAG_LENGTH, extract_mentions, render_text
+
 LEN_TEXT = 15
+EXCERPT_LENGTH = 300
+# Путь комментария — id всех предков и его собственный, каждый дополнен
+# нулями до PATH_STEP знаков, поэтому сортировка по пути даёт порядок
+# обхода дерева, а поддерево — это диапазон путей с общим префиксом.
+PATH_STEP = 10
+MAX_COMMENT_DEPTH = 5
+MAX_TERM_LENGTH = 40
 
 User = get_user_model()
 
@@ -17,11 +27,69 @@ class Group(models.Model):
         return self.title
 
 
+def make_excerpt(text):
+    """Отрывок текста поста для карточек в лентах."""
+    return Truncator(text).chars(EXCERPT_LENGTH)
+
+
+def make_excerpt_html(html):
+    """Отрывок готового HTML: обрезается текст, теги закрываются."""
+    return Truncator(html).chars(EXCERPT_LENGTH, html=True)
+
+
+def resolve_mentions(text):
+    """{имя: id} упомянутых в тексте пользователей за один запрос."""
+    names = extract_mentions(text)
+    if not names:
+        return {}
+    return dict(
+        User.objects.filter(username__in=names).values_list('username', 'id'))
+
+
+def render_body(obj):
+    """Рендерит текст поста или комментария и запоминает упоминания.
+
+    Найденные id пользователей сохраняются в объекте, чтобы сигнал
+    после записи обновил таблицу упоминаний без повторного поиска.
+    """
+    mentions = resolve_mentions(obj.text)
+    obj.text_html = render_text(obj.text, mentions=mentions)
+    obj._mentioned_user_ids = set(mentions.values())
+
+
+class PostQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Только то, что нужно карточке поста: без полного текста."""
+        return self.select_related('author', 'group').defer(
+            'text', 'text_html')
+
+
 class Post(models.Model):
     text = models.TextField()
+    excerpt = models.CharField(
+        'Отрывок',
+        max_length=EXCERPT_LENGTH,
+        blank=True,
+        editable=False,
+    )
+    text_html = models.TextField(
+        'Текст в HTML',
+        blank=True,
+        editable=False,
+    )
+    excerpt_html = models.TextField(
+        'Отрывок в HTML',
+        blank=True,
+        editable=False,
+    )
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикации',)
+    # Меняется при правке поста и при любом изменении его комментариев.
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -39,6 +107,13 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    views = models.PositiveIntegerField(
+        'Просмотры',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['pub_date']
@@ -48,6 +123,17 @@ class Post(models.Model):
     def __str__(self):
         return self.text[:LEN_TEXT]
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            self.excerpt = make_excerpt(self.text)
+            render_body(self)
+            self.excerpt_html = make_excerpt_html(self.text_html)
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'excerpt', 'text_html', 'excerpt_html'}
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -56,6 +142,25 @@ class Comment(models.Model):
         related_name='comments',
         verbose_name='Пост',
     )
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+        verbose_name='Ответ на комментарий',
+    )
+    path = models.CharField(
+        'Путь в ветке',
+        max_length=PATH_STEP * (MAX_COMMENT_DEPTH + 1),
+        blank=True,
+        editable=False,
+    )
+    depth = models.PositiveSmallIntegerField(
+        'Уровень вложенности',
+        default=0,
+        editable=False,
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -66,6 +171,11 @@ class Comment(models.Model):
         verbose_name='Текст комментария',
         help_text='Введите текст комментария',
     )
+    text_html = models.TextField(
+        'Текст в HTML',
+        blank=True,
+        editable=False,
+    )
     created = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата написания комментария',
@@ -73,6 +183,32 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            models.Index(fields=['post', 'path'], name='comment_thread_idx'),
+            models.Index(
+                fields=['post', 'depth', '-created', '-id'],
+                name='comment_page_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            render_body(self)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'text_html'}
+        creating = self.pk is None
+        if creating and self.parent_id is not None:
+            # Ответ глубже предела становится ответом на того же предка,
+            # что и комментарий, на который отвечают.
+            if self.parent.depth >= MAX_COMMENT_DEPTH:
+                self.parent = self.parent.parent
+            self.depth = self.parent.depth + 1
+        super().save(*args, **kwargs)
+        if creating:
+            parent_path = self.parent.path if self.parent_id else ''
+            self.path = f'{parent_path}{self.pk:0{PATH_STEP}d}'
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
 
 
 class Follow(CreatedModel):
@@ -96,3 +232,303 @@ class Follow(CreatedModel):
                 name='unique_follow'
             )
         ]
+
+
+class Tag(models.Model):
+    name = models.CharField(
+        'Хештег',
+        max_length=MAX_TAG_LENGTH,
+        unique=True,
+    )
+
+    class Meta:
+        verbose_name = 'Хештег'
+        verbose_name_plural = 'Хештеги'
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class TaggedPost(models.Model):
+    """Обратный индекс хештегов: строка на каждую пару тег — пост.
+
+    Дата публикации скопирована из поста, чтобы лента тега читалась
+    по одному индексу (tag, pub_date, post) без соединения с постами.
+    """
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='tagged_posts',
+        verbose_name='Хештег',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='tagged',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tag', 'post'],
+                name='unique_tagged_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['tag', '-pub_date', '-post'],
+                name='tagged_post_feed_idx'
+            )
+        ]
+
+
+class Mention(models.Model):
+    """Упоминание пользователя в посте или в комментарии к посту."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Упомянутый пользователь',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Пост',
+    )
+    comment = models.ForeignKey(
+        Comment,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Комментарий',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата упоминания',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                condition=models.Q(comment__isnull=True),
+                name='unique_post_mention'
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'comment'],
+                name='unique_comment_mention'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created', '-id'],
+                name='mention_inbox_idx'
+            )
+        ]
+
+
+class Like(CreatedModel):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Пользователь',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Пост',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_like'
+            )
+        ]
+
+
+class LikeCounter(models.Model):
+    """Одна из нескольких строк-счётчиков лайков поста.
+
+    Лайк увеличивает случайную строку, поэтому одновременные лайки
+    популярного поста не ждут блокировки одной и той же строки.
+    Общее число — сумма по всем строкам поста.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='like_counters',
+        verbose_name='Пост',
+    )
+    shard = models.PositiveSmallIntegerField('Номер счётчика')
+    count = models.IntegerField('Лайков', default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'shard'],
+                name='unique_like_counter_shard'
+            )
+        ]
+
+
+class FollowSuggestion(models.Model):
+    """Автор, на которого стоит подписаться.
+
+    Строки пишет команда build_follow_suggestions, страница профиля
+    только читает их.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+        verbose_name='Пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рекомендуемый автор',
+    )
+    score = models.FloatField('Оценка')
+    rank = models.PositiveSmallIntegerField('Место в списке')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow_suggestion'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'rank'],
+                name='follow_suggestion_idx'
+            )
+        ]
+
+
+class Term(models.Model):
+    """Слово словаря TF-IDF и число постов, в которых оно встречается."""
+    name = models.CharField('Слово', max_length=MAX_TERM_LENGTH, unique=True)
+    df = models.PositiveIntegerField('Постов со словом')
+
+
+class PostTerm(models.Model):
+    """Обратный индекс TF-IDF: вес слова в нормированном векторе поста."""
+    term = models.ForeignKey(
+        Term,
+        on_delete=models.CASCADE,
+        related_name='postings',
+        verbose_name='Слово',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='terms',
+        verbose_name='Пост',
+    )
+    weight = models.FloatField('Вес')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'term'],
+                name='unique_post_term'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['term', '-weight'],
+                name='post_term_postings_idx'
+            )
+        ]
+
+
+class RelatedPost(models.Model):
+    """Похожий пост; список для каждого поста считает build_related_posts."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='related_links',
+        verbose_name='Пост',
+    )
+    related = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий пост',
+    )
+    score = models.FloatField('Косинусная близость')
+    rank = models.PositiveSmallIntegerField('Место в списке')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'related'],
+                name='unique_related_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['post', 'rank'],
+                name='related_post_idx'
+            )
+        ]
+
+
+class TextFingerprint(models.Model):
+    """MinHash-подпись текста поста или комментария для поиска дублей."""
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    post = models.ForeignKey(
+        Post,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост',
+    )
+    comment = models.ForeignKey(
+        Comment,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Комментарий',
+    )
+    signature = models.BinaryField('Подпись')
+    flagged = models.BooleanField(
+        'Похож на тексты других авторов',
+        default=False,
+    )
+    created = models.DateTimeField('Дата', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Отпечаток текста'
+        verbose_name_plural = 'Отпечатки текстов'
+
+
+class TextBand(models.Model):
+    """Корзина LSH — хеш одной полосы MinHash-подписи.
+
+    Тексты с общей корзиной — кандидаты в дубли, их подписи сравниваются.
+    """
+    fingerprint = models.ForeignKey(
+        TextFingerprint,
+        on_delete=models.CASCADE,
+        related_name='bands',
+        verbose_name='Отпечаток',
+    )
+    bucket = models.BigIntegerField('Корзина', db_index=True)
@@ -0,0 +1,205 @@
+"""Похожие посты по косинусной близости TF-IDF.
+
+Вектор поста — веса (1 + log tf) · idf его слов, из которых оставлены
+TERMS_PER_POST самых весомых, нормированный по длине. Векторы хранятся
+в обратном индексе PostTerm, поэтому соседей поста дают только посты
+с общими словами: произведение разреженных матриц считается по строкам
+блоками постов, и полная матрица N×N никогда не строится.
+
+Полный пересчёт обновляет словарь (Term) и все списки соседей. Между
+пересчётами новые посты добавляются по существующему словарю: вектор
+нового поста сравнивается с индексом, и он попадает в списки соседей
+тех постов, которым подходит лучше прежних. Правки текста учитываются
+при следующем полном пересчёте.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Max
+
+from .feeds import bump_generations
+from .markup import URL_RE
+from .models import MAX_TERM_LENGTH, Post, PostTerm, RelatedPost, Term
+
+RELATED_PER_POST = 5
+TERMS_PER_POST = 30
+BLOCK_SIZE = 500
+BATCH_SIZE = 1000
+MIN_DF = 2
+# Слова, которые есть в большей доле постов, считаются стоп-словами.
+MAX_DF_RATIO = 0.5
+# Сколько самых весомых постов слова читать при добавлении нового поста.
+POSTINGS_PER_TERM = 1000
+# Поколение, по которому страница поста сбрасывает кеш после пересчёта.
+RELATED_FEED = 'related'
+
+TOKEN_RE = re.compile(r'[^\W\d_]{3,%d}' % MAX_TERM_LENGTH)
+
+
+def tokenize(text):
+    """Счётчик слов поста в нижнем регистре, без ссылок и чисел."""
+    return Counter(TOKEN_RE.findall(URL_RE.sub(' ', text).lower()))
+
+
+def idf(df, total):
+    return math.log((1 + total) / (1 + df)) + 1
+
+
+def vectorize(counts, vocabulary, total):
+    """Нормированный вектор {id слова: вес} по словарю {слово: (id, df)}."""
+    weights = {}
+    for name, tf in counts.items():
+        if name in vocabulary:
+            term_id, df = vocabulary[name]
+            weights[term_id] = (1 + math.log(tf)) * idf(df, total)
+    top = heapq.nlargest(TERMS_PER_POST, weights.items(),
+                         key=lambda item: item[1])
+    norm = math.sqrt(sum(weight * weight for _, weight in top))
+    return {term_id: weight / norm for term_id, weight in top} if norm else {}
+
+
+def nearest(vector, postings, exclude, limit=RELATED_PER_POST):
+    """Top-N по скалярному произведению с постами из обратного индекса."""
+    scores = Counter()
+    for term_id, weight in vector.items():
+        for post_id, other_weight in postings.get(term_id, ()):
+            scores[post_id] += weight * other_weight
+    scores.pop(exclude, None)
+    return heapq.nlargest(limit, scores.items(),
+                          key=lambda item: (item[1], -item[0]))
+
+
+def _posts_text(batch_size):
+    last_pk = 0
+    while True:
+        batch = list(Post.objects.filter(pk__gt=last_pk).order_by('pk')
+                     .values_list('pk', 'text')[:batch_size])
+        if not batch:
+            return
+        yield from batch
+        last_pk = batch[-1][0]
+
+
+def _related_rows(post_id, neighbours):
+    return [RelatedPost(post_id=post_id, related_id=related_id,
+                        score=score, rank=rank)
+            for rank, (related_id, score) in enumerate(neighbours)]
+
+
+def rebuild_related(limit=RELATED_PER_POST, block_size=BLOCK_SIZE,
+                    batch_size=BATCH_SIZE):
+    """Полный пересчёт словаря, индекса и соседей; возвращает число постов.
+
+    Тексты читаются дважды: сначала для частот слов, затем для векторов,
+    чтобы не держать в памяти все тексты сразу.
+    """
+    df = Counter()
+    total = 0
+    for _, text in _posts_text(batch_size):
+        df.update(set(tokenize(text)))
+        total += 1
+    max_df = max(MIN_DF, int(MAX_DF_RATIO * total))
+    with transaction.atomic():
+        Term.objects.all().delete()
+        Term.objects.bulk_create(
+            [Term(name=name, df=count) for name, count in df.items()
+             if MIN_DF <= count <= max_df],
+            batch_size=batch_size)
+    vocabulary = {name: (term_id, count) for term_id, name, count in
+                  Term.objects.values_list('pk', 'name', 'df').iterator()}
+
+    vectors = {}
+    postings = defaultdict(list)
+    rows = []
+    for post_id, text in _posts_text(batch_size):
+        vector = vectorize(tokenize(text), vocabulary, total)
+        vectors[post_id] = vector
+        for term_id, weight in vector.items():
+            postings[term_id].append((post_id, weight))
+            rows.append(PostTerm(post_id=post_id, term_id=term_id,
+                                 weight=weight))
+        if len(rows) >= batch_size:
+            PostTerm.objects.bulk_create(rows, ignore_conflicts=True)
+            rows = []
+    PostTerm.objects.bulk_create(rows, ignore_conflicts=True)
+
+    post_ids = sorted(vectors)
+    previous_id = 0
+    for start in range(0, len(post_ids), block_size):
+        block = post_ids[start:start + block_size]
+        related = [
+            row for post_id in block
+            for row in _related_rows(
+                post_id, nearest(vectors[post_id], postings, post_id, limit))
+        ]
+        with transaction.atomic():
+            RelatedPost.objects.filter(
+                post_id__gt=previous_id, post_id__lte=block[-1]).delete()
+            RelatedPost.objects.bulk_create(related)
+        previous_id = block[-1]
+    RelatedPost.objects.filter(post_id__gt=previous_id).delete()
+    bump_generations([RELATED_FEED])
+    return len(post_ids)
+
+
+def _merge_neighbour(post_id, new_id, score, limit):
+    """Добавляет новый пост в список соседей, если он туда проходит."""
+    current = list(RelatedPost.objects.filter(post_id=post_id)
+                   .order_by('rank').values_list('related_id', 'score'))
+    merged = heapq.nlargest(limit, current + [(new_id, score)],
+                            key=lambda item: (item[1], -item[0]))
+    if (new_id, score) not in merged:
+        return
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id=post_id).delete()
+        RelatedPost.objects.bulk_create(_related_rows(post_id, merged))
+
+
+def index_new_posts(limit=RELATED_PER_POST):
+    """Добавляет в индекс посты новее последнего проиндексированного."""
+    last_indexed = PostTerm.objects.aggregate(
+        last=Max('post_id'))['last'] or 0
+    total = Post.objects.count()
+    indexed = 0
+    for post_id, text in (Post.objects.filter(pk__gt=last_indexed)
+                          .order_by('pk').values_list('pk', 'text')):
+        counts = tokenize(text)
+        vocabulary = {
+            name: (term_id, df) for term_id, name, df in
+            Term.objects.filter(name__in=list(counts))
+            .values_list('pk', 'name', 'df')
+        }
+        vector = vectorize(counts, vocabulary, total)
+        if not vector:
+            continue
+        postings = {
+            term_id: list(
+                PostTerm.objects.filter(term_id=term_id)
+                .order_by('-weight')
+                .values_list('post_id', 'weight')[:POSTINGS_PER_TERM])
+            for term_id in vector
+        }
+        neighbours = nearest(vector, postings, post_id, limit)
+        with transaction.atomic():
+            PostTerm.objects.bulk_create(
+                [PostTerm(post_id=post_id, term_id=term_id, weight=weight)
+                 for term_id, weight in vector.items()],
+                ignore_conflicts=True)
+            RelatedPost.objects.filter(post_id=post_id).delete()
+            RelatedPost.objects.bulk_create(
+                _related_rows(post_id, neighbours))
+        for related_id, score in neighbours:
+            _merge_neighbour(related_id, post_id, score, limit)
+        indexed += 1
+    if indexed:
+        bump_generations([RELATED_FEED])
+    return indexed
+
+
+def related_post_ids(post, limit=RELATED_PER_POST):
+    """Id похожих постов по порядку — один запрос по индексу."""
+    return list(RelatedPost.objects.filter(post=post).order_by('rank')
+                .values_list('related_id', flat=True)[:limit])
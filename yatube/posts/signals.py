@@ -0,0 +1,117 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.object_cache import object_cache
+
+from .feeds import (AUTHOR_NAME_FIELDS, INDEX_FEED, NAMES_FEED, author_feed,
+                    bump_generations, follow_feed, group_feed, post_feed)
+from .follows import forget_following
+from .hashtags import sync_post_tags
+from .mentions import sync_mentions
+from .models import Comment, Follow, Group, Post, User
+
+
+def post_feeds(author_id, group_ids):
+    """Ленты, в которых показывается пост автора из указанных групп.
+
+    Ленты подписчиков сюда не входят: их поколение зависит от ленты
+    автора (см. feeds.combined_generation).
+    """
+    feeds = [INDEX_FEED, author_feed(author_id)]
+    feeds += [group_feed(group_id) for group_id in group_ids if group_id]
+    return feeds
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    """Запоминает старые группу и текст поста перед редактированием.
+
+    Группа нужна, чтобы при переносе сбросить обе ленты, текст — чтобы
+    обновить индекс хештегов только по разнице.
+    """
+    instance._previous_group_id = None
+    instance._previous_text = None
+    if instance.pk is not None:
+        previous = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'text').first()
+        )
+        if previous is not None:
+            instance._previous_group_id, instance._previous_text = previous
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    group_ids = {instance.group_id,
+                 getattr(instance, '_previous_group_id', None)}
+    bump_generations(post_feeds(instance.author_id, group_ids)
+                     + [post_feed(instance.pk)])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_post(sender, instance, **kwargs):
+    bump_generations([post_feed(instance.post_id)])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_commented_post(sender, instance, raw=False, **kwargs):
+    # update() не вызывает сигналы поста и не сбрасывает кеши лент.
+    if not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            updated_at=timezone.now())
+        object_cache.forget(Post, [instance.post_id])
+
+
+@receiver(post_save, sender=Post)
+def update_post_tags(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous_text = None if created else instance._previous_text
+    if created or previous_text != instance.text:
+        sync_post_tags(instance, previous_text)
+
+
+@receiver(post_save, sender=Post)
+def update_post_mentions(sender, instance, created, raw=False, **kwargs):
+    # Список упоминаний есть, только если при записи рендерился текст.
+    user_ids = getattr(instance, '_mentioned_user_ids', None)
+    if raw or user_ids is None or (created and not user_ids):
+        return
+    sync_mentions(instance, user_ids)
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_mentions(sender, instance, created, raw=False, **kwargs):
+    user_ids = getattr(instance, '_mentioned_user_ids', None)
+    if raw or user_ids is None or (created and not user_ids):
+        return
+    sync_mentions(instance.post, user_ids, comment=instance)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, **kwargs):
+    bump_generations([follow_feed(instance.user_id)])
+    forget_following(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_names(sender, instance, update_fields=None, raw=False,
+                            **kwargs):
+    # Вход пользователя сохраняет только last_login — имена не меняются.
+    if raw or (update_fields is not None
+               and not AUTHOR_NAME_FIELDS & set(update_fields)):
+        return
+    bump_generations([NAMES_FEED])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_names(sender, instance, raw=False, **kwargs):
+    # Удаление группы обнуляет group у постов через update() без сигналов.
+    if not raw:
+        bump_generations([NAMES_FEED])
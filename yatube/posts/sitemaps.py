@@ -0,0 +1,151 @@
+"""Статические файлы sitemap для постов, групп и профилей.
+
+Каждый раздел делится на куски по диапазонам первичного ключа, так что
+строка всегда попадает в один и тот же файл. Для куска считается
+подпись — число строк и последняя дата изменения, — одним запросом
+по диапазону id; файл перезаписывается, только если подпись изменилась.
+Для групп и профилей адрес строится по slug или имени, поэтому в подпись
+входит ещё хеш этих значений — иначе переименование не попало бы в файл.
+Все подписи хранятся в manifest.json рядом с файлами.
+"""
+import hashlib
+import json
+import os
+from xml.sax.saxutils import escape
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max
+from django.urls import reverse
+
+from .models import Group, Post
+
+User = get_user_model()
+# Протокол sitemap разрешает до 50 000 адресов в одном файле.
+SITEMAP_CHUNK = 10_000
+MANIFEST = 'manifest.json'
+INDEX_FILE = 'sitemap.xml'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+class Section:
+    """Раздел sitemap: какие строки брать и как построить их адрес."""
+
+    def __init__(self, name, queryset, key, lastmod, url_name):
+        self.name = name
+        self.queryset = queryset
+        self.key = key
+        self.lastmod = lastmod
+        self.url_name = url_name
+
+    def max_pk(self):
+        return self.queryset.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+
+    def chunk(self, number, size):
+        return self.queryset.filter(
+            pk__gt=number * size, pk__lte=(number + 1) * size)
+
+    def signature(self, rows):
+        """Число строк, последнее изменение и хеш ключей в диапазоне id."""
+        stats = rows.aggregate(
+            count=Count('pk', distinct=True), lastmod=Max(self.lastmod))
+        lastmod = stats['lastmod'] and stats['lastmod'].isoformat()
+        keys = None
+        if self.key != 'pk' and stats['count']:
+            digest = hashlib.md5()
+            for pk, key in rows.order_by('pk').values_list(
+                    'pk', self.key).distinct().iterator():
+                digest.update(f'{pk}:{key}\n'.encode())
+            keys = digest.hexdigest()
+        return [stats['count'], lastmod, keys]
+
+    def urls(self, rows, base_url):
+        rows = (rows.values('pk').annotate(lastmod=Max(self.lastmod))
+                .order_by('pk').values_list(self.key, 'lastmod'))
+        for key, lastmod in rows.iterator():
+            yield (base_url + reverse(self.url_name, args=[key]),
+                   lastmod and lastmod.isoformat())
+
+
+SECTIONS = (
+    Section('posts', Post.objects.all(), 'pk', 'updated_at',
+            'posts:post_detail'),
+    Section('groups', Group.objects.all(), 'slug', 'posts__updated_at',
+            'posts:group_list'),
+    Section('profiles', User.objects.all(), 'username', 'posts__updated_at',
+            'posts:profile'),
+)
+
+
+def _write_atomic(path, lines):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as output:
+        output.writelines(lines)
+    os.replace(tmp_path, path)
+
+
+def _url_lines(tag, entries):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<{tag} xmlns="{XMLNS}">\n'
+    inner = 'sitemap' if tag == 'sitemapindex' else 'url'
+    for loc, lastmod in entries:
+        yield f'<{inner}><loc>{escape(loc)}</loc>'
+        if lastmod:
+            yield f'<lastmod>{lastmod}</lastmod>'
+        yield f'</{inner}>\n'
+    yield f'</{tag}>\n'
+
+
+def _read_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST), encoding='utf-8') as source:
+            return json.load(source)
+    except (OSError, ValueError):
+        return {}
+
+
+def build_sitemaps(root, base_url, files_url, chunk_size=SITEMAP_CHUNK,
+                   full=False):
+    """Обновляет файлы sitemap в root; возвращает (перезаписано, всего).
+
+    base_url — адрес сайта для ссылок на страницы, files_url — путь,
+    по которому веб-сервер отдаёт содержимое root.
+    """
+    os.makedirs(root, exist_ok=True)
+    base_url = base_url.rstrip('/')
+    manifest = _read_manifest(root)
+    if manifest.get('chunk_size') != chunk_size or manifest.get(
+            'base_url') != base_url:
+        full = True
+    old_chunks = {} if full else manifest.get('chunks', {})
+    chunks = {}
+    written = 0
+    for section in SECTIONS:
+        for number in range(-(-section.max_pk() // chunk_size)):
+            rows = section.chunk(number, chunk_size)
+            signature = section.signature(rows)
+            if not signature[0]:
+                continue
+            filename = f'sitemap-{section.name}-{number}.xml'
+            chunks[filename] = signature
+            if old_chunks.get(filename) == signature:
+                continue
+            _write_atomic(
+                os.path.join(root, filename),
+                _url_lines('urlset', section.urls(rows, base_url)))
+            written += 1
+    for filename in set(manifest.get('chunks', {})) - set(chunks):
+        try:
+            os.remove(os.path.join(root, filename))
+        except FileNotFoundError:
+            pass
+    sitemap_url = base_url + files_url
+    _write_atomic(os.path.join(root, INDEX_FILE), _url_lines(
+        'sitemapindex',
+        ((sitemap_url + name, signature[1])
+         for name, signature in sorted(chunks.items()))))
+    _write_atomic(os.path.join(root, MANIFEST), [json.dumps({
+        'chunk_size': chunk_size,
+        'base_url': base_url,
+        'chunks': chunks,
+    })])
+    return written, len(chunks)
@@ -0,0 +1,153 @@
+"""Ленты Atom и RSS для читалок: главная, группа и автор.
+
+Список id последних постов кешируется с поколением ленты в ключе, так что
+частый опрос неизменной ленты не трогает базу: ETag собран из того же
+поколения, и ответ 304 отдаётся до выборки постов. Тело ленты пишется
+потоком, посты читаются пачками по id.
+"""
+import hashlib
+from io import StringIO
+
+from django.core.cache import cache
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.text import Truncator
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .feeds import get_generation
+from .markup import render_cached
+from .models import Post
+
+SYNDICATION_SIZE = 100
+SYNDICATION_BATCH = 25
+TITLE_LENGTH = 80
+SYNDICATION_TIMEOUT = 60 * 60
+# Сколько секунд читалка может не переспрашивать ленту.
+SYNDICATION_MAX_AGE = 5 * 60
+
+
+class StreamingFeedMixin:
+    """Пишет ленту по частям, не собирая все элементы в памяти."""
+
+    def __init__(self, *args, latest=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latest = latest
+
+    def latest_post_date(self):
+        return self.latest or super().latest_post_date()
+
+    def stream(self, batches):
+        buffer = StringIO()
+        handler = SimplerXMLGenerator(buffer, 'utf-8')
+
+        def drain():
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk
+
+        handler.startDocument()
+        self.start_root(handler)
+        self.add_root_elements(handler)
+        yield drain()
+        for batch in batches:
+            self.items = []
+            for item in batch:
+                self.add_item(**item)
+            self.write_items(handler)
+            yield drain()
+        self.end_root(handler)
+        yield drain()
+
+
+class StreamingAtomFeed(StreamingFeedMixin, Atom1Feed):
+    def start_root(self, handler):
+        handler.startElement('feed', self.root_attributes())
+
+    def end_root(self, handler):
+        handler.endElement('feed')
+
+
+class StreamingRssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    def start_root(self, handler):
+        handler.startElement('rss', self.rss_attributes())
+        handler.startElement('channel', self.root_attributes())
+
+    def end_root(self, handler):
+        self.endChannelElement(handler)
+        handler.endElement('rss')
+
+
+FEED_FORMATS = {
+    'atom': StreamingAtomFeed,
+    'rss': StreamingRssFeed,
+}
+
+
+def feed_items(feed, posts):
+    """Id последних постов ленты и дата самого свежего изменения."""
+    key = f'syndication:{feed}:{get_generation(feed)}'
+    cached = cache.get(key)
+    if cached is None:
+        rows = list(posts.order_by('-pub_date', '-pk')
+                    .values_list('pk', 'updated_at')[:SYNDICATION_SIZE])
+        cached = ([pk for pk, _ in rows],
+                  max((updated for _, updated in rows), default=None))
+        cache.set(key, cached, SYNDICATION_TIMEOUT)
+    return cached
+
+
+def post_items(request, post_ids):
+    """Элементы ленты пачками: один запрос на SYNDICATION_BATCH постов."""
+    for start in range(0, len(post_ids), SYNDICATION_BATCH):
+        batch = post_ids[start:start + SYNDICATION_BATCH]
+        posts = Post.objects.select_related('author').in_bulk(batch)
+        items = []
+        for pk in batch:
+            post = posts.get(pk)
+            if post is None:
+                continue
+            link = request.build_absolute_uri(
+                reverse('posts:post_detail', args=[pk]))
+            items.append({
+                'title': Truncator(post.excerpt.split('\n', 1)[0]).chars(
+                    TITLE_LENGTH),
+                'link': link,
+                'unique_id': link,
+                'description': post.text_html or render_cached(post.text),
+                'author_name': (post.author.get_full_name()
+                                or post.author.username),
+                'pubdate': post.pub_date,
+                'updateddate': post.updated_at,
+            })
+        yield items
+
+
+def syndication_response(request, feed, posts, feed_format, title, link,
+                         description=''):
+    """Потоковый ответ с лентой или 304, если у читалки она актуальна."""
+    feed_class = FEED_FORMATS.get(feed_format)
+    if feed_class is None:
+        raise Http404('Неизвестный формат ленты')
+    raw = f'{feed}|{get_generation(feed)}|{feed_format}'
+    etag = '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        post_ids, latest = feed_items(feed, posts)
+        generator = feed_class(
+            title=title,
+            link=request.build_absolute_uri(link),
+            description=description,
+            feed_url=request.build_absolute_uri(),
+            language='ru',
+            latest=latest,
+        )
+        response = StreamingHttpResponse(
+            generator.stream(post_items(request, post_ids)),
+            content_type=generator.content_type,
+        )
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=SYNDICATION_MAX_AGE)
+    return response
@@ -0,0 +1,22 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.markup import render_cached
+
+register = template.Library()
+
+
+@register.filter
+def rendered(obj):
+    """HTML поста или комментария, сохранённый при записи."""
+    if obj.text_html:
+        return mark_safe(obj.text_html)
+    return render_cached(obj.text)
+
+
+@register.filter
+def rendered_excerpt(post):
+    """HTML отрывка поста, сохранённый при записи."""
+    if post.excerpt_html:
+        return mark_safe(post.excerpt_html)
+    return render_cached(post.excerpt or '')
@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.duplicates import minhash, similarity
+from posts.models import Comment, Post, TextFingerprint, User
+
+SPAM = ('Только сегодня скидка девяносто процентов на все товары '
+        'нашего магазина, переходите по ссылке и покупайте')
+
+
+class DuplicateDetectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(username=f'user{i}')
+                     for i in range(3)]
+        cls.post = Post.objects.create(author=cls.users[0], text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_signature_similarity(self):
+        """Почти одинаковые тексты близки, разные — нет."""
+        changed = SPAM.replace('девяносто', 'восемьдесят')
+        other = ('Вчера гуляли в парке и смотрели на уток, '
+                 'которые плавали в пруду у старого моста')
+        self.assertGreater(similarity(minhash(SPAM), minhash(SPAM)), 0.99)
+        self.assertGreater(similarity(minhash(SPAM), minhash(changed)), 0.3)
+        self.assertLess(similarity(minhash(SPAM), minhash(other)), 0.2)
+        self.assertIsNone(minhash('Спасибо!'))
+
+    def test_same_author_cannot_repeat_post(self):
+        self.client.force_login(self.users[1])
+        url = reverse('posts:post_create')
+        self.client.post(url, {'text': SPAM})
+        response = self.client.post(url, {'text': SPAM + '!'})
+        self.assertEqual(Post.objects.filter(text__startswith='Только')
+                         .count(), 1)
+        self.assertFormError(response, 'form', 'text',
+                             'Вы уже публиковали почти такой же текст.')
+
+    def test_edit_is_checked_and_replaces_fingerprint(self):
+        """Правку в чужой спам ловит проверка, подпись поста обновляется."""
+        self.client.force_login(self.users[1])
+        self.client.post(reverse('posts:post_create'), {'text': SPAM})
+        post = Post.objects.create(author=self.users[1], text='Обычный пост')
+        url = reverse('posts:post_edit', args=[post.pk])
+        response = self.client.post(url, {'text': SPAM + '!'})
+        self.assertFormError(response, 'form', 'text',
+                             'Вы уже публиковали почти такой же текст.')
+        text = ('Вчера гуляли в парке и смотрели на уток, '
+                'которые плавали в пруду у старого моста')
+        self.client.post(url, {'text': text})
+        # Повторное сохранение того же текста не считается дублем.
+        response = self.client.post(url, {'text': text})
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=[post.pk]))
+        self.assertEqual(
+            TextFingerprint.objects.filter(post=post).count(), 1)
+
+    def test_comment_burst_from_many_authors(self):
+        """Второй автор помечается, третий отклоняется как рассылка."""
+        url = reverse('posts:add_comment', args=[self.post.pk])
+        statuses = []
+        for user in self.users:
+            self.client.force_login(user)
+            response = self.client.post(
+                url, {'text': SPAM}, HTTP_ACCEPT='application/json')
+            statuses.append(response.status_code)
+        self.assertEqual(statuses, [201, 201, 400])
+        self.assertEqual(Comment.objects.filter(text=SPAM).count(), 2)
+        self.assertEqual(
+            list(TextFingerprint.objects.order_by('pk')
+                 .values_list('flagged', flat=True)),
+            [False, True])
@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from posts.feeds import (INDEX_FEED, combined_generation, follow_feed,
+                         get_generation, group_feed)
+from posts.follows import follow_feeds
+from posts.models import Follow, Group, Post, User
+from posts.utils import CachedCountPaginator, func_paginator
+
+
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='counter')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Счётчики',
+            slug='counters',
+            description='Проверка кеша количества',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост {i}')
+            for i in range(13)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/', {'page': 2})
+
+    def test_count_is_cached_per_feed(self):
+        """Повторный подсчёт ленты не обращается к базе."""
+        posts = Post.objects.filter(group=self.group)
+        page_obj = func_paginator(self.request, posts,
+                                  feed=group_feed(self.group.pk))
+        self.assertEqual(page_obj.paginator.count, 13)
+        self.assertEqual(len(page_obj), 3)
+        with self.assertNumQueries(0):
+            paginator = CachedCountPaginator(
+                posts, 10, feed=group_feed(self.group.pk))
+            self.assertEqual(paginator.count, 13)
+
+    def test_new_post_invalidates_count(self):
+        """Новый пост сбрасывает закешированное количество."""
+        posts = Post.objects.filter(group=self.group)
+        feed = group_feed(self.group.pk)
+        self.assertEqual(CachedCountPaginator(posts, 10, feed=feed).count, 13)
+        Post.objects.create(author=self.user, group=self.group, text='Ещё')
+        self.assertEqual(CachedCountPaginator(posts, 10, feed=feed).count, 14)
+
+    def test_follow_changes_follow_feed_generation(self):
+        """Подписка и новый пост автора обновляют ленту подписчика."""
+        generation = combined_generation(follow_feeds(self.reader))
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertNotEqual(
+            combined_generation(follow_feeds(self.reader)), generation)
+        generation = combined_generation(follow_feeds(self.reader))
+        own_generation = get_generation(follow_feed(self.reader.pk))
+        Post.objects.create(author=self.user, text='Для подписчиков')
+        self.assertNotEqual(
+            combined_generation(follow_feeds(self.reader)), generation)
+        # Пост автора не пишет в счётчики подписчиков.
+        self.assertEqual(
+            get_generation(follow_feed(self.reader.pk)), own_generation)
+
+    def test_large_feed_uses_estimate(self):
+        """Для огромной ленты используется оценка вместо COUNT(*)."""
+        paginator = CachedCountPaginator(
+            Post.objects.all(), 10, feed=INDEX_FEED,
+            estimate=lambda: 250_000)
+        self.assertEqual(paginator.count, 250_000)
@@ -107,6 +107,28 @@ class PostsFormTests(TestCase):
                               kwargs={'post_id': PostsFormTests.post.pk})
         )
 
+    def test_create_a_comment_ajax(self):
+        """Для запроса скрипта возвращается только фрагмент комментария."""
+        response = self.authorized_client.post(
+            reverse('posts:add_comment',
+                    kwargs={'post_id': PostsFormTests.post.pk}),
+            data={'text': 'Быстрый ответ'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertIn('Быстрый ответ', data['html'])
+        self.assertEqual(
+            data['count'], PostsFormTests.post.comments.count())
+        response = self.authorized_client.post(
+            reverse('posts:add_comment',
+                    kwargs={'post_id': PostsFormTests.post.pk}),
+            data={'text': ''},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.json()['errors'])
+
     # Проверяем, что анонимный пользователь не может создать пост
     def test_anonymus_cant_create_a_post(self):
         """Проверяем, что анонимный пользователь не может создать пост."""
@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.markup import extract_hashtags
+from posts.models import Post, Tag, TaggedPost, User
+
+
+class HashtagTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='tagger')
+
+    def setUp(self):
+        cache.clear()
+
+    def tagged_names(self, post):
+        return set(TaggedPost.objects.filter(post=post)
+                   .values_list('tag__name', flat=True))
+
+    def test_extract_hashtags(self):
+        """Хештеги приводятся к нижнему регистру, ссылки не учитываются."""
+        self.assertEqual(
+            extract_hashtags('#Django и #python, https://x.ru/#anchor a#b'),
+            {'django', 'python'})
+
+    def test_index_follows_post_edits(self):
+        """Индекс обновляется по разнице при правке и удалении поста."""
+        post = Post.objects.create(author=self.user, text='#один #два')
+        self.assertEqual(self.tagged_names(post), {'один', 'два'})
+        post.text = '#два #три'
+        post.save()
+        self.assertEqual(self.tagged_names(post), {'два', 'три'})
+        post.delete()
+        self.assertFalse(TaggedPost.objects.exists())
+
+    def test_tag_feed_uses_cursor(self):
+        """Лента тега листается по курсору."""
+        for i in range(12):
+            Post.objects.create(author=self.user, text=f'#лента {i}')
+        url = reverse('posts:tag_posts', kwargs={'name': 'лента'})
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['posts']), 10)
+        self.assertEqual(response.context['posts'][0].excerpt, '#лента 11')
+        response = self.client.get(
+            url, {'cursor': response.context['next_cursor']})
+        self.assertEqual([post.excerpt for post in response.context['posts']],
+                         ['#лента 1', '#лента 0'])
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_rebuild_command(self):
+        """Команда восстанавливает индекс для существующих постов."""
+        post = Post.objects.create(author=self.user, text='#восстановить')
+        stale = Post.objects.create(author=self.user, text='#старый')
+        TaggedPost.objects.filter(post=post).delete()
+        # Текст изменён в обход сигналов — индекс устарел.
+        Post.objects.filter(pk=stale.pk).update(text='#новый')
+        call_command('rebuild_hashtags', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.tagged_names(post), {'восстановить'})
+        self.assertEqual(self.tagged_names(stale), {'новый'})
+        self.assertTrue(Tag.objects.filter(name='восстановить').exists())
+        self.assertFalse(Tag.objects.filter(name='старый').exists())
+
+    def test_hashtag_is_linked(self):
+        """Хештег в тексте становится ссылкой на ленту тега."""
+        post = Post.objects.create(author=self.user, text='Про #Django')
+        url = reverse('posts:tag_posts', kwargs={'name': 'django'})
+        self.assertIn(f'<a href="{url}">#Django</a>', post.text_html)
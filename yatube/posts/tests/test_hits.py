@@ -0,0 +1,46 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.hits import ViewCounterBuffer, view_counter
+from posts.models import Post, User
+
+
+@override_settings(POST_VIEWS_FLUSH_INTERVAL=None)
+class ViewCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='viewed')
+        cls.post = Post.objects.create(author=cls.user, text='Смотрите')
+        cls.other_post = Post.objects.create(author=cls.user, text='И это')
+
+    def setUp(self):
+        cache.clear()
+        # Сбрасываем просмотры, накопленные другими тестами.
+        view_counter.flush()
+        self.post.refresh_from_db()
+        self.other_post.refresh_from_db()
+
+    def test_views_are_buffered_until_flush(self):
+        """Просмотры копятся в памяти и не пишутся в базу сразу."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.context['post'].view_count,
+                         self.post.views + 2)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).views,
+                         self.post.views)
+
+    def test_flush_writes_one_update_per_batch(self):
+        """Сброс пишет все посты пачки одним запросом."""
+        buffer = ViewCounterBuffer()
+        for _ in range(3):
+            buffer.hit(self.post.pk)
+        buffer.hit(self.other_post.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.flush(), 2)
+        views = dict(Post.objects.values_list('pk', 'views'))
+        self.assertEqual(views[self.post.pk], self.post.views + 3)
+        self.assertEqual(views[self.other_post.pk], self.other_post.views + 1)
+        self.assertEqual(buffer.pending(self.post.pk), 0)
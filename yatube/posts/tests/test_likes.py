@@ -0,0 +1,65 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.likes import (LIKE_SHARDS, annotate_likes, get_like_counts, like,
+                         unlike)
+from posts.models import Like, LikeCounter, Post, User
+
+
+class LikeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='liked')
+        cls.fans = [User.objects.create_user(username=f'fan{i}')
+                    for i in range(20)]
+        cls.post = Post.objects.create(author=cls.author, text='Лайкни')
+        cls.other_post = Post.objects.create(author=cls.author, text='Ещё')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_like_is_idempotent(self):
+        """Повторный лайк и повторная отмена не меняют счётчик."""
+        fan = self.fans[0]
+        self.assertTrue(like(fan, self.post))
+        self.assertFalse(like(fan, self.post))
+        self.assertEqual(get_like_counts([self.post.pk]), {self.post.pk: 1})
+        self.assertTrue(unlike(fan, self.post))
+        self.assertFalse(unlike(fan, self.post))
+        self.assertEqual(get_like_counts([self.post.pk]), {self.post.pk: 0})
+
+    def test_counts_are_spread_over_shards(self):
+        """Лайки раскладываются по строкам-счётчикам и суммируются."""
+        for fan in self.fans:
+            like(fan, self.post)
+        counters = LikeCounter.objects.filter(post=self.post)
+        self.assertLessEqual(counters.count(), LIKE_SHARDS)
+        self.assertEqual(get_like_counts([self.post.pk])[self.post.pk], 20)
+        self.assertEqual(Like.objects.filter(post=self.post).count(), 20)
+
+    def test_page_annotation_uses_constant_queries(self):
+        """Счётчики и лайки пользователя для страницы — по одному запросу."""
+        like(self.fans[0], self.other_post)
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(2):
+            annotate_likes(posts, self.fans[0])
+        with self.assertNumQueries(1):
+            annotate_likes(posts, self.fans[0])
+        liked = {post.pk: (post.like_count, post.is_liked) for post in posts}
+        self.assertEqual(liked, {self.post.pk: (0, False),
+                                 self.other_post.pk: (1, True)})
+
+    def test_like_endpoints(self):
+        """Эндпоинты принимают только POST и возвращают на страницу."""
+        self.client.force_login(self.fans[1])
+        url = reverse('posts:post_like', kwargs={'post_id': self.post.pk})
+        self.assertEqual(self.client.get(url).status_code, 405)
+        response = self.client.post(url, {'next': '/'})
+        self.assertRedirects(response, '/')
+        self.client.post(url)
+        self.assertEqual(Like.objects.filter(post=self.post).count(), 1)
+        self.client.post(
+            reverse('posts:post_unlike', kwargs={'post_id': self.post.pk}))
+        self.assertFalse(Like.objects.filter(post=self.post).exists())
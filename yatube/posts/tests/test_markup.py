@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from posts.markup import render_cached, render_text
+from posts.models import Comment, Post, User
+from posts.templatetags.post_markup import rendered
+
+
+class RenderTextTests(SimpleTestCase):
+    def test_html_is_escaped(self):
+        """Пользовательский HTML экранируется."""
+        self.assertEqual(render_text('<script>alert(1)</script>'),
+                         '<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>')
+
+    def test_links_and_formatting(self):
+        """Ссылки и простая разметка превращаются в теги."""
+        html = render_text('Смотри https://example.com/a?b=1&c=2, **это** '
+                           'и *то*\nновая строка\n\nабзац')
+        self.assertIn('<a href="https://example.com/a?b=1&amp;c=2" ', html)
+        self.assertIn('</a>, <strong>это</strong> и <em>то</em><br>', html)
+        self.assertTrue(html.endswith('<p>абзац</p>'))
+
+    def test_markup_inside_links_is_untouched(self):
+        """Разметка не применяется внутри адреса ссылки."""
+        html = render_text('https://example.com/*a*')
+        self.assertNotIn('<em>', html)
+
+
+class StoredHtmlTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='markup')
+        cls.post = Post.objects.create(author=cls.user, text='**Пост**')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_html_is_stored_on_save(self):
+        """HTML поста и комментария сохраняется при записи."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий')
+        self.assertEqual(self.post.text_html, '<p><strong>Пост</strong></p>')
+        self.assertEqual(comment.text_html, '<p>Комментарий</p>')
+
+    def test_filter_falls_back_to_cache(self):
+        """Без сохранённого HTML рендер берётся из кеша по хешу текста."""
+        Post.objects.filter(pk=self.post.pk).update(text_html='')
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(rendered(post), render_text(post.text))
+        self.assertEqual(render_cached(post.text), render_text(post.text))
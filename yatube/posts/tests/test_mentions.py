@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Mention, Post, User, resolve_mentions
+
+
+class MentionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.alice = User.objects.create_user(username='alice')
+        cls.bob = User.objects.create_user(username='bob.smith')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_usernames_resolved_in_one_query(self):
+        """Все упоминания текста проверяются одним запросом."""
+        with self.assertNumQueries(1):
+            resolved = resolve_mentions(
+                '@alice, @bob.smith. и @ghost, mail@alice.ru')
+        self.assertEqual(resolved, {'alice': self.alice.pk,
+                                    'bob.smith': self.bob.pk})
+
+    def test_only_existing_users_are_linked(self):
+        """Ссылками становятся только существующие пользователи."""
+        post = Post.objects.create(author=self.author,
+                                   text='Привет @alice и @ghost')
+        url = reverse('posts:profile', kwargs={'username': 'alice'})
+        self.assertIn(f'<a href="{url}">@alice</a>', post.text_html)
+        self.assertIn('@ghost', post.text_html)
+        self.assertNotIn('/profile/ghost/', post.text_html)
+
+    def test_mentions_are_recorded_and_synced(self):
+        """Упоминания пишутся в таблицу и обновляются при правке."""
+        post = Post.objects.create(author=self.author,
+                                   text='@alice @writer')
+        self.assertEqual(
+            list(Mention.objects.values_list('user__username', flat=True)),
+            ['alice'])
+        post.text = '@bob.smith'
+        post.save()
+        self.assertEqual(
+            list(Mention.objects.values_list('user__username', flat=True)),
+            ['bob.smith'])
+
+    def test_inbox_lists_post_and_comment_mentions(self):
+        """Во входящих видны упоминания из постов и комментариев."""
+        post = Post.objects.create(author=self.author, text='@alice')
+        comment = Comment.objects.create(
+            post=post, author=self.bob, text='Согласен, @alice')
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('posts:mention_inbox'))
+        mentions = list(response.context['mentions'])
+        self.assertEqual([m.comment for m in mentions], [comment, None])
+        self.assertContains(response, 'Согласен')
@@ -1,7 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import EXCERPT_LENGTH, Group, Post
 
 User = get_user_model()
 LEN_TEXT = 15
@@ -33,3 +33,28 @@ class PostModelTest(TestCase):
         value = str(self.group)
         expected_value = self.group.title
         self.assertEqual(value, expected_value)
+
+    def test_post_excerpt_is_kept_in_sync(self):
+        """Отрывок пересчитывается при сохранении текста поста."""
+        post = Post.objects.create(author=self.user, text='а' * 1000)
+        self.assertEqual(len(post.excerpt), EXCERPT_LENGTH)
+        post.text = 'Короткий текст'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'Короткий текст')
+
+    def test_excerpt_html_is_cut_after_rendering(self):
+        """Отрывок в HTML содержит упоминания и не рвёт разметку."""
+        text = '@auth **' + ' '.join(['слово'] * 100) + '**'
+        post = Post.objects.create(author=self.user, text=text)
+        self.assertIn('href="/profile/auth/"', post.excerpt_html)
+        self.assertTrue(post.excerpt_html.startswith('<p><a'))
+        self.assertTrue(post.excerpt_html.endswith('</strong></p>'))
+        self.assertNotIn('**', post.excerpt_html)
+
+    def test_listing_queryset_defers_text(self):
+        """Лента не загружает полный текст поста."""
+        post = Post.objects.for_listing().get(pk=self.post.pk)
+        self.assertIn('text', post.get_deferred_fields())
+        with self.assertNumQueries(0):
+            self.assertEqual(post.author, self.user)
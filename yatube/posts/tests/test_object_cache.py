@@ -0,0 +1,66 @@
+import warnings
+
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.http import Http404
+from django.test import TestCase
+
+from core.object_cache import object_cache
+from posts.models import Group, Post, User
+
+
+class ObjectCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Текст')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lookups_are_served_from_cache(self):
+        """Повторный поиск по pk и по slug не обращается к базе."""
+        object_cache.get(Group, slug='group')
+        with self.assertNumQueries(0):
+            self.assertEqual(object_cache.get(Group, slug='group'),
+                             self.group)
+            self.assertEqual(object_cache.get(Group, pk=self.group.pk),
+                             self.group)
+
+    def test_unique_values_make_valid_keys(self):
+        """Пробелы и кириллица в slug не попадают в ключ кеша как есть."""
+        group = Group.objects.create(
+            title='Кириллица', slug='тест слаг', description='Описание')
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            self.assertEqual(object_cache.get(Group, slug='тест слаг'),
+                             group)
+
+    def test_bulk_priming_and_attach(self):
+        """Объекты из QuerySet кладутся пачкой и подставляются в связи."""
+        # Неполные объекты из for_listing() в кеш не попадают.
+        object_cache.prime(Post.objects.for_listing())
+        with self.assertNumQueries(1):
+            object_cache.get(Post, pk=self.post.pk)
+        object_cache.prime(User.objects.all())
+        object_cache.prime(Group.objects.all())
+        with self.assertNumQueries(0):
+            post = object_cache.get(Post, pk=self.post.pk)
+            object_cache.attach([post], 'author', 'group')
+            self.assertEqual(post.author.username, 'writer')
+            self.assertEqual(post.group.slug, 'group')
+
+    def test_save_and_rename_invalidate(self):
+        """После сохранения и переименования кеш не отдаёт старые данные."""
+        object_cache.get(User, username='writer')
+        self.author.username = 'renamed'
+        self.author.save()
+        self.assertIsNone(object_cache.get(User, username='writer'))
+        self.assertEqual(
+            object_cache.get(User, username='renamed').pk, self.author.pk)
+        self.post.delete()
+        with self.assertRaises(Http404):
+            object_cache.get_or_404(Post, pk=self.post.pk)
@@ -0,0 +1,51 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Follow, FollowSuggestion, User
+from posts.recommendations import load_follow_graph, top_suggestions
+
+
+class FollowSuggestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.friend, cls.star, cls.other, cls.fan = [
+            User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'star', 'other', 'fan')
+        ]
+        # reader читает friend, friend читает star: star — друг друга.
+        # fan читает friend вместе с reader и ещё other.
+        for user, author in ((cls.reader, cls.friend),
+                             (cls.friend, cls.star),
+                             (cls.fan, cls.friend),
+                             (cls.fan, cls.other)):
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_scores_rank_friends_of_friends_first(self):
+        following, followers = load_follow_graph(batch_size=2)
+        suggested = [author for author, _ in
+                     top_suggestions(self.reader.pk, following, followers)]
+        self.assertEqual(suggested, [self.star.pk, self.other.pk])
+
+    def test_command_fills_table_and_profile_sidebar(self):
+        """Команда пишет рекомендации, профиль показывает их без
+        авторов, на которых пользователь уже подписался."""
+        call_command('build_follow_suggestions', stdout=StringIO())
+        self.assertEqual(
+            list(FollowSuggestion.objects.filter(user=self.reader)
+                 .order_by('rank').values_list('author', flat=True)),
+            [self.star.pk, self.other.pk])
+        self.client.force_login(self.reader)
+        url = reverse('posts:profile', args=[self.reader.username])
+        response = self.client.get(url)
+        self.assertEqual(response.context['suggestions'],
+                         [self.star, self.other])
+        Follow.objects.create(user=self.reader, author=self.star)
+        response = self.client.get(url)
+        self.assertEqual(response.context['suggestions'], [self.other])
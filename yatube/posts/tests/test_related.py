@@ -0,0 +1,60 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Post, RelatedPost, User
+from posts.related import tokenize, vectorize
+
+
+class RelatedPostsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer')
+        texts = [
+            'Варим кофе в турке: зерна, помол и пенка',
+            'Кофе в турке без пенки: зерна слишком крупный помол',
+            'Ремонт велосипеда: цепь и звёздочки',
+            'Цепь велосипеда скрипит, меняем звёздочки',
+            'Погода сегодня солнечная',
+        ]
+        cls.posts = [Post.objects.create(author=cls.author, text=text)
+                     for text in texts]
+
+    def setUp(self):
+        cache.clear()
+
+    def build(self, *args):
+        call_command('build_related_posts', *args, stdout=StringIO())
+
+    def related(self, post):
+        return list(RelatedPost.objects.filter(post=post).order_by('rank')
+                    .values_list('related_id', flat=True))
+
+    def test_vector_is_normalized(self):
+        vector = vectorize(tokenize('кофе кофе зерна'),
+                           {'кофе': (1, 2), 'зерна': (2, 2)}, 5)
+        self.assertAlmostEqual(sum(w * w for w in vector.values()), 1)
+
+    def test_rebuild_finds_posts_with_common_words(self):
+        """Посты про одно и то же становятся соседями друг друга."""
+        self.build()
+        coffee, coffee2, bike, bike2, weather = self.posts
+        self.assertEqual(self.related(coffee), [coffee2.pk])
+        self.assertEqual(self.related(bike2), [bike.pk])
+        self.assertEqual(self.related(weather), [])
+        response = self.client.get(
+            reverse('posts:post_detail', args=[coffee.pk]))
+        self.assertEqual(response.context['related_posts'], [coffee2])
+
+    def test_new_post_is_indexed_incrementally(self):
+        """Новый пост находит соседей и попадает в их списки."""
+        self.build()
+        bike, bike2 = self.posts[2], self.posts[3]
+        post = Post.objects.create(
+            author=self.author, text='Звёздочки и цепь для велосипеда')
+        self.build('--new')
+        self.assertEqual(set(self.related(post)), {bike.pk, bike2.pk})
+        self.assertIn(post.pk, self.related(bike))
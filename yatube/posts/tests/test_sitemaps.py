@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from xml.dom import minidom
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Comment, Group, Post, User
+
+SITEMAP_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(SITEMAP_ROOT=SITEMAP_ROOT,
+                   SITEMAP_BASE_URL='http://example.com')
+class SitemapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {i}')
+            for i in range(7)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(SITEMAP_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def build(self):
+        call_command('build_sitemaps', chunk_size=5, stdout=StringIO())
+        return {name: os.stat(os.path.join(SITEMAP_ROOT, name)).st_mtime_ns
+                for name in os.listdir(SITEMAP_ROOT)
+                if name.startswith('sitemap-')}
+
+    def test_only_changed_chunks_are_rewritten(self):
+        """Повторная сборка трогает только кусок с изменённым постом."""
+        first = self.build()
+        first_post = self.posts[0].pk // 5
+        name = f'sitemap-posts-{first_post}.xml'
+        self.assertIn(name, first)
+        with open(os.path.join(SITEMAP_ROOT, name), encoding='utf-8') as f:
+            self.assertIn(f'http://example.com/posts/{self.posts[0].pk}/',
+                          f.read())
+        self.assertEqual(self.build(), first)
+        Comment.objects.create(author=self.author, post=self.posts[0],
+                               text='Комментарий')
+        changed = {name for name, mtime in self.build().items()
+                   if first.get(name) != mtime}
+        self.assertIn(name, changed)
+        last = f'sitemap-posts-{self.posts[-1].pk // 5}.xml'
+        if last != name:
+            self.assertNotIn(last, changed)
+
+    def test_renames_rewrite_chunks(self):
+        """Новый slug или имя автора попадают в файл при сборке."""
+        first = self.build()
+        Group.objects.filter(pk=self.group.pk).update(slug='renamed')
+        User.objects.filter(pk=self.author.pk).update(username='new_writer')
+        second = self.build()
+        for section, pk, url in (
+                ('groups', self.group.pk, '/group/renamed/'),
+                ('profiles', self.author.pk, '/profile/new_writer/')):
+            name = f'sitemap-{section}-{(pk - 1) // 5}.xml'
+            self.assertNotEqual(second[name], first[name])
+            with open(os.path.join(SITEMAP_ROOT, name),
+                      encoding='utf-8') as f:
+                self.assertIn(url, f.read())
+
+    def test_index_lists_chunks(self):
+        chunks = self.build()
+        index = minidom.parse(os.path.join(SITEMAP_ROOT, 'sitemap.xml'))
+        locations = [node.firstChild.data for node in
+                     index.getElementsByTagName('loc')]
+        self.assertEqual(
+            sorted(locations),
+            sorted(f'http://example.com/sitemaps/{name}' for name in chunks))
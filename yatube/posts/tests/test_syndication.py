@@ -0,0 +1,68 @@
+from xml.dom import minidom
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+class SyndicationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Запись номер {i}')
+            for i in range(30)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_are_streamed(self):
+        """Ленты всех видов отдаются потоком и содержат записи."""
+        urls = {
+            reverse('posts:index_syndication', args=['atom']): '<entry>',
+            reverse('posts:index_syndication', args=['rss']): '<item>',
+            reverse('posts:group_syndication',
+                    args=[self.group.slug, 'atom']): '<entry>',
+            reverse('posts:profile_syndication',
+                    args=[self.author.username, 'rss']): '<item>',
+        }
+        for url, element in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.streaming)
+                body = b''.join(response.streaming_content).decode()
+                minidom.parseString(body)
+                self.assertEqual(body.count(element), 30)
+                self.assertIn('Запись номер 29', body)
+
+    def test_conditional_get(self):
+        """Неизменная лента отдаётся ответом 304 без запросов к постам."""
+        urls = [
+            reverse('posts:index_syndication', args=['atom']),
+            reverse('posts:group_syndication', args=[self.group.slug, 'rss']),
+            reverse('posts:profile_syndication',
+                    args=[self.author.username, 'atom']),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+        url = urls[0]
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(author=self.author, text='Свежая')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Свежая',
+                      b''.join(response.streaming_content).decode())
+
+    def test_unknown_format(self):
+        url = reverse('posts:index_syndication', args=['json'])
+        self.assertEqual(self.client.get(url).status_code, 404)
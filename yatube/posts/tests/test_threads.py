@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import MAX_COMMENT_DEPTH, Comment, Post, User
+from posts.threads import THREAD_PREVIEW, attach_threads, load_subtree
+from posts.views import COMMENTS_PER_PAGE
+
+
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='threads')
+        cls.post = Post.objects.create(author=cls.user, text='Обсуждаем')
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, text, parent=None):
+        return Comment.objects.create(
+            post=self.post, author=self.user, text=text, parent=parent)
+
+    def test_subtree_is_loaded_in_tree_order(self):
+        """Поддерево выбирается одним запросом в порядке обхода."""
+        root = self.comment('корень')
+        first = self.comment('первый', root)
+        second = self.comment('второй', root)
+        nested = self.comment('вложенный', first)
+        self.comment('другая ветка')
+        with self.assertNumQueries(1):
+            replies = load_subtree(root)
+        self.assertEqual(replies, [first, nested, second])
+        self.assertEqual(nested.depth, 2)
+        self.assertTrue(nested.path.startswith(first.path))
+
+    def test_depth_is_limited(self):
+        """Ответы глубже предела прикрепляются к предку."""
+        comment = self.comment('0')
+        for level in range(MAX_COMMENT_DEPTH + 2):
+            comment = self.comment(str(level + 1), comment)
+        self.assertEqual(comment.depth, MAX_COMMENT_DEPTH)
+
+    def test_long_threads_are_collapsed(self):
+        """Короткие ветки раскрыты, длинные свёрнуты."""
+        short = self.comment('короткая')
+        self.comment('ответ', short)
+        long = self.comment('длинная')
+        for i in range(THREAD_PREVIEW + 1):
+            self.comment(f'ответ {i}', long)
+        with self.assertNumQueries(3):
+            roots = attach_threads(
+                self.post.pk, self.post.comments.filter(depth=0))
+        threads = {root.pk: root for root in roots}
+        self.assertFalse(threads[short.pk].collapsed)
+        self.assertEqual(len(threads[short.pk].thread), 1)
+        self.assertTrue(threads[long.pk].collapsed)
+        self.assertEqual(threads[long.pk].reply_total, THREAD_PREVIEW + 1)
+
+    def test_reply_via_form(self):
+        """Ответ отправляется формой комментария с полем parent."""
+        root = self.comment('корень')
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'ответ', 'parent': root.pk})
+        reply = Comment.objects.get(text='ответ')
+        self.assertEqual(reply.parent, root)
+        response = self.client.get(reverse(
+            'posts:comment_thread',
+            kwargs={'post_id': self.post.pk, 'comment_id': root.pk}))
+        self.assertEqual(response.context['replies'], [reply])
+
+    def test_comments_are_paginated_by_cursor(self):
+        """Первая страница веток — в посте, следующие — фрагментами."""
+        for i in range(COMMENTS_PER_PAGE + 5):
+            self.comment(f'комментарий {i}')
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertEqual(len(response.context['comments']), COMMENTS_PER_PAGE)
+        cursor = response.context['next_cursor']
+        self.assertIsNotNone(cursor)
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'cursor': cursor})
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual([c.text for c in response.context['comments']],
+                         [f'комментарий {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(response.context['next_cursor'])
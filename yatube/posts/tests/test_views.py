@@ -241,3 +241,156 @@ class PostPagesTests(TestCase):
         )
         self.assertNotIn(PostPagesTests.post,
                          response.context['page_obj'])
+
+    def test_feed_cards_fragment(self):
+        """Следующая порция ленты отдаётся фрагментом без макета."""
+        Post.objects.bulk_create(
+            Post(author=PostPagesTests.user, group=PostPagesTests.group,
+                 text=f'Карточка {i}')
+            for i in range(12)
+        )
+        feeds = {
+            reverse('posts:index'): reverse('posts:index_cards'),
+            reverse('posts:group_list',
+                    kwargs={'slug': PostPagesTests.group.slug}):
+            reverse('posts:group_cards',
+                    kwargs={'slug': PostPagesTests.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': PostPagesTests.user.username}):
+            reverse('posts:profile_cards',
+                    kwargs={'username': PostPagesTests.user.username}),
+        }
+        for page_url, cards_url in feeds.items():
+            with self.subTest(page_url=page_url):
+                cache.clear()
+                response = self.authorized_client.get(page_url)
+                self.assertEqual(response.context['cards_url'], cards_url)
+                response = self.authorized_client.get(
+                    cards_url, {'cursor': response.context['next_cursor']})
+                self.assertNotContains(response, '<html')
+                self.assertContains(response, '<article>', count=3)
+                self.assertContains(
+                    response, f'name="next" value="{page_url}"', count=3)
+                self.assertIn('max-age', response['Cache-Control'])
+
+    @staticmethod
+    def rename(instance, **fields):
+        for field, value in fields.items():
+            setattr(instance, field, value)
+        instance.save()
+
+    def test_conditional_get(self):
+        """Неизменные страницы отдаются ответом 304, изменённые — заново."""
+        post_url = reverse('posts:post_detail',
+                           kwargs={'post_id': PostPagesTests.post.pk})
+        profile_url = reverse(
+            'posts:profile', kwargs={'username': PostPagesTests.user.username})
+        like_kwargs = {'post_id': PostPagesTests.post.pk}
+        # Каждое изменение проверяется отдельно: лайк ставит и снимает
+        # автор поста, а страницы запрашивает другой пользователь.
+        changes = (
+            ('комментарий', post_url, lambda: Comment.objects.create(
+                author=PostPagesTests.user, text='Новый',
+                post=PostPagesTests.post)),
+            ('лайк', post_url, lambda: self.authorized_client.post(
+                reverse('posts:post_like', kwargs=like_kwargs))),
+            ('пост автора', post_url, lambda: Post.objects.create(
+                author=PostPagesTests.user, text='Ещё')),
+            ('снятый лайк', profile_url, lambda: self.authorized_client.post(
+                reverse('posts:post_unlike', kwargs=like_kwargs))),
+            ('пост в профиле', profile_url, lambda: Post.objects.create(
+                author=PostPagesTests.user, text='И ещё')),
+            ('имя автора', post_url, lambda: self.rename(
+                User.objects.get(pk=PostPagesTests.user.pk),
+                first_name='Грустный')),
+            ('фамилия в профиле', profile_url, lambda: self.rename(
+                User.objects.get(pk=PostPagesTests.user.pk),
+                last_name='Студент')),
+            ('название группы', post_url, lambda: self.rename(
+                Group.objects.get(pk=PostPagesTests.group.pk),
+                title='Новая')),
+        )
+        for name, url, change in changes:
+            with self.subTest(change=name):
+                etag = self.other_client.get(url)['ETag']
+                response = self.other_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                change()
+                response = self.other_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_cached_index_is_per_user(self):
+        """Кеш главной не отдаёт чужие лайки и CSRF-токен."""
+        self.other_client.post(reverse(
+            'posts:post_like', kwargs={'post_id': PostPagesTests.post.pk}))
+        response = self.other_client.get(reverse('posts:index'))
+        self.assertContains(response, 'btn-danger')
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'btn-danger')
+        response = Client().get(reverse('posts:index'))
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+
+    def test_cached_index_shows_own_changes(self):
+        """После лайка и подписки главная из кеша показывает новое."""
+        index = reverse('posts:index')
+        response = self.other_client.get(index)
+        self.assertNotContains(response, 'btn-danger')
+        response = self.other_client.post(
+            reverse('posts:post_like',
+                    kwargs={'post_id': PostPagesTests.post.pk}),
+            {'next': index}, follow=True)
+        self.assertContains(response, 'btn-danger')
+        self.assertContains(response, '♥ 1')
+        self.other_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.user.username}))
+        self.assertContains(self.other_client.get(index), 'вы подписаны')
+
+    def test_cached_index_hides_other_users_follows(self):
+        """Отметки «вы подписаны» из кеша главной видит только их владелец."""
+        Follow.objects.create(user=self.other_user, author=self.user)
+        response = self.other_client.get(reverse('posts:index'))
+        self.assertContains(response, 'вы подписаны')
+        for client in (self.authorized_client, Client()):
+            with self.subTest(client=client):
+                response = client.get(reverse('posts:index'))
+                self.assertNotContains(response, 'вы подписаны')
+
+    def test_comment_updates_post_timestamp(self):
+        """Комментарий сдвигает дату изменения поста и Last-Modified."""
+        post = PostPagesTests.post
+        post.refresh_from_db()
+        before = post.updated_at
+        Comment.objects.create(author=PostPagesTests.user, text='Ещё',
+                               post=post)
+        post.refresh_from_db()
+        self.assertGreater(post.updated_at, before)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+        self.assertIn('Last-Modified', response)
+
+    def test_profile_following_state(self):
+        """Кнопка подписки учитывает автора профиля, а не любую подписку."""
+        Follow.objects.create(user=self.other_user, author=self.author)
+        profile = 'posts:profile'
+        response = self.other_client.get(
+            reverse(profile, kwargs={'username': self.author.username}))
+        self.assertTrue(response.context['following'])
+        response = self.other_client.get(
+            reverse(profile, kwargs={'username': self.user.username}))
+        self.assertFalse(response.context['following'])
+        self.other_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}))
+        response = self.other_client.get(
+            reverse(profile, kwargs={'username': self.author.username}))
+        self.assertFalse(response.context['following'])
+
+    def test_cards_mark_followed_authors(self):
+        """Карточки отмечают авторов, на которых подписан читатель."""
+        Follow.objects.create(user=self.other_user, author=self.user)
+        response = self.other_client.get(reverse('posts:index'))
+        post = response.context['page_obj'][0]
+        self.assertTrue(post.author_followed)
+        self.assertContains(response, 'вы подписаны')
@@ -0,0 +1,73 @@
+"""Загрузка веток комментариев по материализованному пути."""
+from collections import defaultdict
+
+from django.db.models import Count, Q
+from django.db.models.functions import Substr
+
+from .models import PATH_STEP, Comment
+
+# Ветки не длиннее этого числа ответов показываются раскрытыми,
+# более длинные сворачиваются и загружаются отдельной страницей.
+THREAD_PREVIEW = 5
+# Символ больше любой цифры: [путь, путь + PATH_END) — всё поддерево.
+PATH_END = '~'
+
+
+def subtree_q(paths):
+    """Условие на ответы (без самих корней) для веток с путями paths."""
+    condition = Q()
+    for path in paths:
+        condition |= Q(path__gt=path, path__lt=path + PATH_END)
+    return condition
+
+
+def load_subtree(comment):
+    """Все ответы ветки в порядке обхода одним запросом по индексу."""
+    return list(
+        Comment.objects.filter(post_id=comment.post_id)
+        .filter(subtree_q([comment.path]))
+        .select_related('author')
+        .order_by('path')
+    )
+
+
+def reply_counts(post_id, roots):
+    """Словарь {путь корня: число ответов в ветке} одним запросом."""
+    paths = [root.path for root in roots]
+    if not paths:
+        return {}
+    return dict(
+        Comment.objects.filter(post_id=post_id, depth__gt=0)
+        .annotate(root=Substr('path', 1, PATH_STEP))
+        .filter(root__in=paths)
+        .order_by()
+        .values_list('root')
+        .annotate(total=Count('pk'))
+    )
+
+
+def attach_threads(post_id, roots):
+    """Добавляет корневым комментариям ответы коротких веток.
+
+    У каждого корня появляются атрибуты thread (ответы в порядке обхода),
+    reply_total и collapsed — есть ли ответы, которые не загружены.
+    """
+    roots = list(roots)
+    counts = reply_counts(post_id, roots)
+    short = [root.path for root in roots
+             if 0 < counts.get(root.path, 0) <= THREAD_PREVIEW]
+    threads = defaultdict(list)
+    if short:
+        replies = (
+            Comment.objects.filter(post_id=post_id)
+            .filter(subtree_q(short))
+            .select_related('author')
+            .order_by('path')
+        )
+        for reply in replies:
+            threads[reply.path[:PATH_STEP]].append(reply)
+    for root in roots:
+        root.thread = threads[root.path]
+        root.reply_total = counts.get(root.path, 0)
+        root.collapsed = root.reply_total > len(root.thread)
+    return roots
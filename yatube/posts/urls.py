@@ -6,8 +6,31 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('cards/', views.index_cards, name='index_cards'),
+    path(
+        'feed/<str:feed_format>/',
+        views.index_syndication,
+        name='index_syndication'
+    ),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/cards/', views.group_cards, name='group_cards'),
+    path(
+        'group/<slug:slug>/feed/<str:feed_format>/',
+        views.group_syndication,
+        name='group_syndication'
+    ),
+    path('tags/<str:name>/', views.tag_posts, name='tag_posts'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/cards/',
+        views.profile_cards,
+        name='profile_cards'
+    ),
+    path(
+        'profile/<str:username>/feed/<str:feed_format>/',
+        views.profile_syndication,
+        name='profile_syndication'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
@@ -16,9 +39,27 @@ urlpatterns = [
         views.add_comment,
         name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
+    path(
+        'posts/<int:post_id>/comments/<int:comment_id>/',
+        views.comment_thread,
+        name='comment_thread'
+    ),
+    path('posts/<int:post_id>/like/', views.post_like, name='post_like'),
+    path(
+        'posts/<int:post_id>/unlike/',
+        views.post_unlike,
+        name='post_unlike'
+    ),
     path('', views.index, name='index'),
     path('index', views.index),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/cards/', views.follow_cards, name='follow_cards'),
+    path('mentions/', views.mention_inbox, name='mention_inbox'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,10 +1,140 @@
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+from .feeds import (COUNT_TIMEOUT, ESTIMATED_COUNT_TIMEOUT,
+                    combined_generation, count_key)
 
 POST_COUNT_PER_PAGE = 10
+# Начиная с этого размера ленты точный COUNT(*) заменяется оценкой.
+COUNT_ESTIMATE_THRESHOLD = 100_000
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class CachedCountPaginator(Paginator):
+    """Паджинатор, который кеширует число объектов ленты.
+
+    Число хранится в кеше под ключом с поколением ленты и сбрасывается
+    сигналами при изменении постов или подписок. feed — имя ленты или
+    список лент, от которых она зависит; ключ строится по первой из них,
+    а поколение — по всем. Если задана функция
+    estimate и она вернула число больше порога, вместо точного подсчёта
+    используется оценка: последние страницы очень длинной ленты при этом
+    могут оказаться пустыми.
+    """
+
+    def __init__(self, object_list, per_page, feed=None, estimate=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.feed = feed
+        self.estimate = estimate
+
+    @cached_property
+    def count(self):
+        if self.feed is None:
+            return self._exact_count()
+        feeds = [self.feed] if isinstance(self.feed, str) else self.feed
+        key = count_key(feeds[0], combined_generation(feeds))
+        count = cache.get(key)
+        if count is not None:
+            return count
+        estimated = self.estimate() if self.estimate else None
+        if estimated is not None and estimated >= COUNT_ESTIMATE_THRESHOLD:
+            cache.set(key, estimated, ESTIMATED_COUNT_TIMEOUT)
+            return estimated
+        count = self._exact_count()
+        cache.set(key, count, COUNT_TIMEOUT)
+        return count
 
+    def _exact_count(self):
+        return Paginator.count.func(self)
 
-def func_paginator(request, posts):
-    paginator = Paginator(posts, POST_COUNT_PER_PAGE)
+
+def estimate_by_max_pk(queryset):
+    """Оценка размера таблицы по максимальному первичному ключу.
+
+    Выбирается по индексу и не требует полного прохода по таблице.
+    """
+    def estimate():
+        return queryset.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+    return estimate
+
+
+def wants_fragment(request):
+    """Запрос от скрипта страницы (XHR или fetch), а не обычный переход."""
+    return (request.is_ajax()
+            or 'application/json' in request.META.get('HTTP_ACCEPT', ''))
+
+
+def func_paginator(request, posts, feed=None, estimate=None):
+    paginator = CachedCountPaginator(
+        posts, POST_COUNT_PER_PAGE, feed=feed, estimate=estimate)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def encode_cursor(moment, pk):
+    """Курсор вида «микросекунды_id»: короткий и безопасный для URL."""
+    return f'{(moment - EPOCH) // MICROSECOND}_{pk}'
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор; для испорченного значения возвращает None."""
+    try:
+        micros, pk = (int(part) for part in cursor.split('_'))
+        return EPOCH + micros * MICROSECOND, pk
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+class KeysetPage:
+    """Страница ленты, выбранная по курсору, а не по номеру."""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def keyset_page(queryset, cursor, per_page=POST_COUNT_PER_PAGE,
+                date_field='pub_date', id_field='pk', descending=True):
+    """Выбирает страницу в порядке (дата, id) после курсора.
+
+    В отличие от OFFSET стоимость не растёт с глубиной ленты: каждая
+    страница — это поиск по индексу с позиции предыдущей.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        moment, pk = position
+        after = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__{after}': moment})
+            | Q(**{date_field: moment, f'{id_field}__{after}': pk})
+        )
+    sign = '-' if descending else ''
+    items = list(queryset.order_by(
+        f'{sign}{date_field}', f'{sign}{id_field}')[:per_page + 1])
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = page_cursor(items, date_field, id_field)
+    return KeysetPage(items, next_cursor)
+
+
+def page_cursor(items, date_field='pub_date', id_field='pk'):
+    """Курсор на позицию после последнего объекта страницы."""
+    last = list(items)[-1]
+    return encode_cursor(getattr(last, date_field), getattr(last, id_field))
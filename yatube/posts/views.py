@@ -1,71 +1,324 @@
+import hashlib
+from functools import wraps
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import is_safe_url
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition, require_POST
+
+from core.object_cache import object_cache
+from core.ratelimit import ratelimit
 
+from .duplicates import remember_text, replace_text
+from .feeds import (INDEX_FEED, NAMES_FEED, author_feed, author_likes_feed,
+                    combined_generation, follow_feed, get_generations,
+                    group_feed, likes_feed)
+from .follows import (annotate_following, follow_feeds, following_ids,
+                      is_following)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
-from .utils import func_paginator
+from .hits import view_counter
+from .likes import annotate_likes, get_like_counts, like, unlike
+from .models import Comment, Follow, Group, Post, Tag
+from .recommendations import SUGGESTIONS_FEED, suggestions_for
+from .related import RELATED_FEED, related_post_ids
+from .syndication import syndication_response
+from .threads import attach_threads, load_subtree
+from .utils import (estimate_by_max_pk, func_paginator, keyset_page,
+                    page_cursor, wants_fragment)
 
 User = get_user_model()
 POSTS_PAGE = 10
+COMMENTS_PER_PAGE = 20
+# Сколько секунд браузер может переиспользовать фрагмент ленты.
+CARDS_MAX_AGE = 30
+
+
+def redirect_back(request, *args, **kwargs):
+    """Возвращает на страницу из поля next или на указанный адрес."""
+    next_url = request.POST.get('next')
+    if next_url and is_safe_url(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect(*args, **kwargs)
+
+
+def user_state_feeds(request):
+    """Лайки и подписки пользователя, которые видны в карточках ленты."""
+    if not request.user.is_authenticated:
+        return []
+    return [likes_feed(request.user.pk), follow_feed(request.user.pk)]
+
+
+def cache_page_per_session(timeout, key_prefix, feeds=user_state_feeds):
+    """cache_page с отдельной копией страницы для каждой сессии.
+
+    Страница вошедшего пользователя содержит его лайки, подписки
+    и CSRF-токен, привязанный к cookie браузера, поэтому делить её
+    можно только внутри одной сессии. Анонимные посетители получают
+    общую копию. В ключ входит поколение лент feeds(request): после
+    своего лайка или подписки пользователь сразу видит новое состояние,
+    а чужие изменения появляются, когда копия истечёт.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            session = ''
+            if request.user.is_authenticated:
+                # Ключ сессии — секрет, в ключ кеша попадает только хеш.
+                session = hashlib.md5(
+                    request.session.session_key.encode()).hexdigest()
+            page_feeds = feeds(request)
+            generation = (combined_generation(page_feeds)
+                          if page_feeds else '')
+            cached = cache_page(
+                timeout,
+                key_prefix=f'{key_prefix}:{session}:{generation}')(view)
+            return cached(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def page_etag(request, *parts):
+    """ETag страницы: её данные, номер или курсор и пользователь."""
+    raw = '|'.join(str(part) for part in (
+        *parts, request.GET.get('page', ''), request.GET.get('cursor', ''),
+        request.user.pk))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def post_state(request, post_id):
+    """Дата изменения и автор поста; запоминаются, чтобы не читать дважды."""
+    cached = getattr(request, '_post_state', None)
+    if cached is None or cached[0] != post_id:
+        state = (Post.objects.filter(pk=post_id)
+                 .values_list('updated_at', 'author_id').first())
+        cached = request._post_state = (post_id, state)
+    return cached[1]
+
+
+def post_updated_at(request, post_id):
+    state = post_state(request, post_id)
+    return state[0] if state else None
+
+
+def post_detail_etag(request, post_id):
+    state = post_state(request, post_id)
+    if state is None:
+        return None
+    updated_at, author_id = state
+    parts = [updated_at.isoformat(), get_like_counts([post_id])[post_id]]
+    # Лента автора — ради счётчика его постов на странице, имена — ради
+    # подписей автора, комментаторов и группы.
+    feeds = [RELATED_FEED, author_feed(author_id), NAMES_FEED]
+    if request.user.is_authenticated:
+        feeds.append(likes_feed(request.user.pk))
+    parts += get_generations(feeds).values()
+    return page_etag(request, *parts)
+
+
+def profile_etag(request, username):
+    author = object_cache.get(User, username=username)
+    if author is None:
+        return None
+    feeds = [author_feed(author.pk), author_likes_feed(author.pk),
+             NAMES_FEED]
+    if request.user.is_authenticated:
+        feeds += [follow_feed(request.user.pk), likes_feed(request.user.pk),
+                  SUGGESTIONS_FEED]
+    return page_etag(request, *get_generations(feeds).items())
 
 
-@cache_page(20, key_prefix='index_page')
+def scroll_context(page_obj, cards_url):
+    """Откуда странице подгружать следующие карточки при прокрутке."""
+    return {
+        'cards_url': cards_url,
+        'next_cursor': page_cursor(page_obj) if page_obj.has_next() else None,
+    }
+
+
+def render_cards(request, posts, page_url, descending=True):
+    """Следующая порция ленты — только карточки, без макета страницы.
+
+    Шаблон рендерится без запроса, поэтому контекст-процессоры не
+    выполняются; нужные карточкам пользователь и CSRF-токен передаются
+    явно. page_url — адрес ленты, куда вернуться после лайка.
+    """
+    page = keyset_page(posts, request.GET.get('cursor'),
+                       descending=descending)
+    annotate_following(page, request.user)
+    context = {
+        'posts': annotate_likes(page, request.user),
+        'next_cursor': page.next_cursor,
+        'cards_url': request.path,
+        'next_url': page_url,
+        'user': request.user,
+    }
+    if request.user.is_authenticated:
+        context['csrf_token'] = get_token(request)
+    response = HttpResponse(
+        render_to_string('includes/post_cards.html', context))
+    patch_cache_control(
+        response, max_age=CARDS_MAX_AGE,
+        **{'private' if request.user.is_authenticated else 'public': True})
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+@cache_page_per_session(20, key_prefix='index_page')
 def index(request):
-    post_list = Post.objects.all().order_by('-pub_date')
-    page_obj = func_paginator(request, post_list)
+    post_list = Post.objects.for_listing().order_by('-pub_date')
+    page_obj = func_paginator(request, post_list, feed=INDEX_FEED,
+                              estimate=estimate_by_max_pk(Post.objects))
+    annotate_likes(page_obj, request.user)
+    annotate_following(page_obj, request.user)
     context = {
         'page_obj': page_obj,
+        **scroll_context(page_obj, reverse('posts:index_cards')),
     }
     template = 'posts/index.html'
     return render(request, template, context)
 
 
+@cache_page(20, key_prefix='index_cards')
+def index_cards(request):
+    return render_cards(request, Post.objects.for_listing(),
+                        reverse('posts:index'))
+
+
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
-    page_obj = func_paginator(request, posts)
+    group = object_cache.get_or_404(Group, slug=slug)
+    posts = group.posts.for_listing()
+    page_obj = func_paginator(request, posts, feed=group_feed(group.pk))
+    annotate_likes(page_obj, request.user)
+    annotate_following(page_obj, request.user)
     context = {
         'group': group,
-        'page_obj': page_obj, }
+        'page_obj': page_obj,
+        **scroll_context(page_obj, reverse('posts:group_cards', args=[slug])),
+    }
     return render(request, 'posts/group_list.html', context)
 
 
+def group_cards(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return render_cards(request, group.posts.for_listing(),
+                        reverse('posts:group_list', args=[slug]),
+                        descending=False)
+
+
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.lower())
+    entries = keyset_page(
+        tag.tagged_posts.all(), request.GET.get('cursor'),
+        id_field='post_id')
+    posts = Post.objects.for_listing().in_bulk(
+        [entry.post_id for entry in entries])
+    context = {
+        'tag': tag,
+        'posts': annotate_following(annotate_likes(
+            [posts[entry.post_id] for entry in entries], request.user),
+            request.user),
+        'next_cursor': entries.next_cursor,
+    }
+    return render(request, 'posts/tag_posts.html', context)
+
+
+@condition(etag_func=profile_etag)
 def profile(request, username):
-    user_selected = get_object_or_404(User,
-                                      username=username)
-    posts = Post.objects.filter(author__username=username)
-    page_obj = func_paginator(request, posts)
-    following = (request.user.is_authenticated
-                 and Follow.objects.filter(user=request.user).exists())
+    user_selected = object_cache.get_or_404(User, username=username)
+    posts = Post.objects.for_listing().filter(author=user_selected)
+    page_obj = func_paginator(request, posts,
+                              feed=author_feed(user_selected.pk))
+    annotate_likes(page_obj, request.user)
+    followed = following_ids(request.user)
     context = {
         'page_obj': page_obj,
         'author': user_selected,
-        'following': following,
+        'following': user_selected.pk in followed,
+        'suggestions': suggestions_for(request.user, followed),
+        **scroll_context(
+            page_obj, reverse('posts:profile_cards', args=[username])),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def profile_cards(request, username):
+    author = get_object_or_404(User, username=username)
+    return render_cards(request, author.posts.for_listing(),
+                        reverse('posts:profile', args=[username]),
+                        descending=False)
+
+
+def comment_page(post, cursor):
+    """Страница корневых комментариев поста вместе с их ветками."""
+    roots = post.comments.filter(depth=0).select_related('author')
+    page = keyset_page(roots, cursor, per_page=COMMENTS_PER_PAGE,
+                       date_field='created')
+    return attach_threads(post.pk, page), page.next_cursor
+
+
+# Повторный запрос с 304 не учитывается как просмотр.
+@condition(etag_func=post_detail_etag,
+           last_modified_func=post_updated_at)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    post = object_cache.get_or_404(Post, pk=post_id)
+    object_cache.attach([post], 'author', 'group')
+    annotate_likes([post], request.user)
+    view_counter.hit(post.pk)
+    post.view_count = post.views + view_counter.pending(post.pk)
+    comments, next_cursor = comment_page(post, request.GET.get('cursor'))
     form = CommentForm(request.POST or None)
+    related_ids = related_post_ids(post)
+    related = object_cache.get_many(Post, related_ids)
 
     context = {
         'post': post,
         'comments': comments,
+        'comment_count': post.comments.count(),
+        'related_posts': [related[pk] for pk in related_ids if pk in related],
+        'next_cursor': next_cursor,
         'form': form,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев в виде HTML-фрагмента."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments, next_cursor = comment_page(post, request.GET.get('cursor'))
+    context = {
+        'post': post,
+        'comments': comments,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
+def comment_thread(request, post_id, comment_id):
+    root = get_object_or_404(
+        Comment.objects.select_related('author', 'post'),
+        pk=comment_id, post_id=post_id)
+    context = {
+        'post': root.post,
+        'root': root,
+        'replies': load_subtree(root),
+    }
+    return render(request, 'posts/comment_thread.html', context)
+
+
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = PostForm(request.POST,
                     files=request.FILES or None,
-                    instance=post)
+                    instance=post,
+                    author=post.author)
     context = {
         'form': form,
         'post': post,
@@ -73,22 +326,27 @@ def post_edit(request, post_id):
     if request.method == "POST":
         if form.is_valid():
             post.save()
+            if 'text' in form.changed_data:
+                replace_text(form.duplicate_check, post)
             return redirect('posts:post_detail', post_id)
 
     return render(request, 'posts/create_post.html', context)
 
 
 @login_required
+@ratelimit('post_create')
 def post_create(request):
     if request.method == 'POST':
         form = PostForm(
             request.POST,
             files=request.FILES or None,
+            author=request.user,
         )
         if form.is_valid():
             new_post = form.save(commit=False)
             new_post.author = request.user
             new_post.save()
+            remember_text(form.duplicate_check, post=new_post)
             return redirect('posts:profile', new_post.author)
     else:
         form = PostForm()
@@ -99,44 +357,133 @@ def post_create(request):
 
 
 @login_required
+@ratelimit('add_comment')
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    form = CommentForm(request.POST or None)
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    form = CommentForm(request.POST or None, author=request.user)
 
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        parent_id = request.POST.get('parent', '')
+        if parent_id.isdigit():
+            comment.parent = get_object_or_404(
+                Comment, pk=parent_id, post=post)
         comment.save()
+        remember_text(form.duplicate_check, post=post, comment=comment)
+    if not wants_fragment(request):
+        return redirect('posts:post_detail', post_id=post_id)
+    # Скрипту страницы хватает разметки нового комментария и счётчика,
+    # пост и остальные комментарии заново не загружаются.
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    html = render_to_string(
+        'includes/comment.html', {'comment': comment}, request=request)
+    return JsonResponse(
+        {
+            'html': html,
+            'parent': comment.parent_id,
+            'count': post.comments.count(),
+        },
+        status=201,
+    )
+
+
+@require_POST
+@login_required
+def post_like(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    like(request.user, post)
+    return redirect_back(request, 'posts:post_detail', post_id=post_id)
+
 
-    return redirect('posts:post_detail', post_id=post_id)
+@require_POST
+@login_required
+def post_unlike(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    unlike(request.user, post)
+    return redirect_back(request, 'posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = func_paginator(request, posts)
+    posts = Post.objects.for_listing().filter(
+        author__following__user=request.user)
+    page_obj = func_paginator(request, posts,
+                              feed=follow_feeds(request.user))
+    annotate_likes(page_obj, request.user)
     context = {
         'page_obj': page_obj,
+        **scroll_context(page_obj, reverse('posts:follow_cards')),
     }
 
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+def follow_cards(request):
+    posts = Post.objects.for_listing().filter(
+        author__following__user=request.user)
+    return render_cards(request, posts, reverse('posts:follow_index'),
+                        descending=False)
+
+
+@login_required
+def mention_inbox(request):
+    mentions = request.user.mentions.select_related(
+        'post__author', 'post__group', 'comment__author',
+    ).defer('post__text', 'post__text_html')
+    page = keyset_page(mentions, request.GET.get('cursor'),
+                       date_field='created')
+    annotate_likes([mention.post for mention in page], request.user)
+    context = {
+        'mentions': page,
+        'next_cursor': page.next_cursor,
+    }
+    return render(request, 'posts/mentions.html', context)
+
+
+@login_required
+@ratelimit('follow', methods=('GET', 'POST'))
 def profile_follow(request, username):
-    follow_author = get_object_or_404(User, username=username)
+    follow_author = object_cache.get_or_404(User, username=username)
 
-    if follow_author != request.user:
+    if (follow_author != request.user
+            and not is_following(request.user, follow_author)):
         Follow.objects.get_or_create(user=request.user, author=follow_author)
 
     return redirect('posts:profile', username)
 
 
 @login_required
+@ratelimit('follow', methods=('GET', 'POST'))
 def profile_unfollow(request, username):
-    follow_author = get_object_or_404(User, username=username)
-    Follow.objects.filter(
-        author=follow_author, user=request.user).delete()
+    follow_author = object_cache.get_or_404(User, username=username)
+    if is_following(request.user, follow_author):
+        Follow.objects.filter(
+            author=follow_author, user=request.user).delete()
 
     return redirect('posts:profile', username)
+
+
+def index_syndication(request, feed_format):
+    return syndication_response(
+        request, INDEX_FEED, Post.objects.all(), feed_format,
+        title='Yatube: последние записи', link=reverse('posts:index'))
+
+
+def group_syndication(request, slug, feed_format):
+    group = object_cache.get_or_404(Group, slug=slug)
+    return syndication_response(
+        request, group_feed(group.pk), group.posts.all(), feed_format,
+        title=group.title, description=group.description,
+        link=reverse('posts:group_list', args=[slug]))
+
+
+def profile_syndication(request, username, feed_format):
+    author = object_cache.get_or_404(User, username=username)
+    return syndication_response(
+        request, author_feed(author.pk), author.posts.all(), feed_format,
+        title=f'Записи {author.get_full_name() or author.username}',
+        link=reverse('posts:profile', args=[username]))
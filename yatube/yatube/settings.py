@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -27,16 +28,18 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ConcurrencyLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware', ]
@@ -70,6 +73,25 @@ DATABASES = {
     }
 }
 
+# Общий для всех процессов файловый кеш с LRU в памяти каждого процесса.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'yatube_cache')),
+        'OPTIONS': {
+            'L1_MAX_ENTRIES': 1000,
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+# Тесты получают свой каталог кеша и не очищают кеш локального сервера.
+TEST_RUNNER = 'core.test_runner.IsolatedCacheRunner'
+
+# Сессия и пользователь запроса читаются из кеша, а не из базы.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -109,5 +131,34 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Лимиты частоты запросов к пишущим view: «запросов/интервал» (s, m, h, d).
+RATELIMITS = {
+    'post_create': '10/m',
+    'add_comment': '20/m',
+    'follow': '30/m',
+}
+
+# Сколько тяжёлых запросов группы выполняется одновременно в процессе
+# (limit) и во всех процессах с общим CONCURRENCY_SHARED_DIR
+# (shared_limit); лишние ждут queue_timeout секунд и получают 503.
+CONCURRENCY_LIMITS = {
+    'feeds': {
+        'views': ['posts:follow_index', 'posts:profile'],
+        'limit': 8,
+        'shared_limit': 16,
+        'queue_timeout': 0.5,
+        'retry_after': 2,
+    },
+}
+CONCURRENCY_SHARED_DIR = os.getenv('CONCURRENCY_SHARED_DIR')
+
+# Как часто фоновый поток сбрасывает накопленные просмотры постов в базу.
+POST_VIEWS_FLUSH_INTERVAL = 30
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Файлы sitemap пишет команда build_sitemaps, отдаёт их веб-сервер.
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+SITEMAP_URL = '/sitemaps/'
+SITEMAP_BASE_URL = os.getenv('SITEMAP_BASE_URL', 'http://localhost:8000')